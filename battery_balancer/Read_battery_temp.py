@@ -13,49 +13,89 @@ It performs the following key functions:
 - Handles graceful shutdown on Ctrl+C and uses retries with exponential backoff for network errors.
 - Runs in an infinite loop, polling at configurable intervals.
 
-Dependencies: Standard Python libraries (socket, statistics, time, configparser, logging, signal, gc, os).
+Dependencies: Standard Python libraries (socket, struct, statistics, time, configparser, logging, signal, gc, os).
 No external packages required.
 
 Note: Ensure the EDS4100 is configured for Modbus RTU tunneling over TCP (not native Modbus TCP). Verify port and slave ID.
 """
 
 import socket  # This imports the socket library, which allows the script to communicate over the network, like connecting to the EDS4100 device.
+import struct  # This imports the struct library, used to decode all the binary temperature values from the response in a single step.
 import statistics  # This imports the statistics library, used to calculate things like the median (middle value) of the temperatures.
 import time  # This imports the time library, used to add delays in the code, like waiting a short time after sending data.
 import configparser  # This imports the configparser library, used to read settings from an INI file instead of hardcoding them in the script.
 import logging  # This imports the logging library, used to write events and data to a file for persistent records.
 import signal  # This imports the signal library, used to handle interruptions like Ctrl+C for graceful shutdown.
-import gc  # This imports the garbage collector, used to manually clean up memory in long-running loops.
+import gc  # This imports the garbage collector, used to tune automatic memory cleanup for the long-running loop.
 import os  # This imports the os library, used to get the current working directory for debugging file paths and clear the screen for ASCII GUI.
 
+def _crc16_table_entry(index):  # This defines a helper that works out one slot of the CRC lookup table by running the 8 bit-shifts once for that byte value.
+    crc = index  # Starts with the byte value itself (0-255).
+    for _ in range(8):  # Loops through 8 times (since each byte has 8 bits).
+        if crc & 0x0001:  # Checks if the least significant bit (rightmost bit) is 1.
+            crc = (crc >> 1) ^ 0xA001  # Shifts the CRC right by 1 bit and XORs with the Modbus polynomial (A001).
+        else:  # If the bit is 0.
+            crc >>= 1  # Just shifts the CRC right by 1 bit.
+    return crc  # Returns the finished table entry for this byte value.
+
+CRC16_TABLE = [_crc16_table_entry(i) for i in range(256)]  # Precomputed lookup table (built once at import) so the CRC can process a whole byte per step instead of one bit at a time.
+
 def modbus_crc(data):  # This defines a function to calculate the CRC (Cyclic Redundancy Check), which is a way to verify that the data sent or received hasn't been corrupted.
     crc = 0xFFFF  # Starts the CRC value at 65535 (in hexadecimal, that's FFFF), a standard starting point for Modbus CRC.
+    table = CRC16_TABLE  # Local reference to the lookup table for faster access inside the loop.
     for byte in data:  # Loops through each byte in the data.
-        crc ^= byte  # Performs a bitwise XOR operation between the current CRC and the byte.
-        for _ in range(8):  # Loops through 8 times (since each byte has 8 bits).
-            if crc & 0x0001:  # Checks if the least significant bit (rightmost bit) is 1.
-                crc = (crc >> 1) ^ 0xA001  # Shifts the CRC right by 1 bit and XORs with the Modbus polynomial (A001).
-            else:  # If the bit is 0.
-                crc >>= 1  # Just shifts the CRC right by 1 bit.
+        crc = (crc >> 8) ^ table[(crc ^ byte) & 0xFF]  # Table-driven step: combines the low CRC byte with the data byte and looks up the result of all 8 shifts at once.
     return crc.to_bytes(2, 'little')  # Converts the final CRC to 2 bytes in little-endian order (low byte first) and returns it.
 
+_queries = {}  # Cache of complete Modbus queries (including CRC), keyed by channel count, so each one is only built once.
+_decoders = {}  # Cache of compiled struct decoders for the register data, keyed by channel count.
+_sock = None  # Persistent TCP connection to the EDS4100, reused across polls and only reopened after an error.
+
+def build_query(num_channels):  # This defines a function that returns the Modbus query for reading num_channels registers, building it only the first time.
+    query = _queries.get(num_channels)  # Looks up a previously built query.
+    if query is None:  # First time for this channel count.
+        # Modbus RTU query: Slave 1, Function 03 (read holding registers), Start 0, Count num_channels, CRC will be calculated.
+        query_base = bytes([1, 3]) + (0).to_bytes(2, 'big') + (num_channels).to_bytes(2, 'big')  # Builds the base part of the query message without CRC: slave ID 1, function 3, start register 0 (2 bytes), quantity num_channels (2 bytes).
+        query = query_base + modbus_crc(query_base)  # Adds the CRC to the end of the query to complete the message.
+        _queries[num_channels] = query  # Stores it for the next polls.
+    return query  # Returns the complete query.
+
+def close_connection():  # This defines a function to close the persistent connection (after an error or on shutdown).
+    global _sock  # Uses the module-level socket.
+    if _sock is not None:  # Only if a connection is open.
+        try:  # Closing can fail if the connection is already broken.
+            _sock.close()  # Closes the socket to free up resources.
+        except OSError:  # Ignores errors from an already broken connection.
+            pass  # Nothing else to do.
+        _sock = None  # Marks the connection as closed so the next read reconnects.
+
 def read_ntc_sensors(ip, port, query_delay, num_channels, scaling_factor, max_retries=3, retry_backoff_base=1):  # This defines the main function to read the sensor data from the device using the given IP address and port, with added retries for timeouts.
-    # Modbus RTU query: Slave 1, Function 03 (read holding registers), Start 0, Count num_channels, CRC will be calculated.
-    query_base = bytes([1, 3]) + (0).to_bytes(2, 'big') + (num_channels).to_bytes(2, 'big')  # Builds the base part of the query message without CRC: slave ID 1, function 3, start register 0 (2 bytes), quantity num_channels (2 bytes).
-    crc = modbus_crc(query_base)  # Calculates the CRC for the base query.
-    query = query_base + crc  # Adds the CRC to the end of the query to complete the message.
+    # Note: query_delay is no longer used; the read waits for the complete response frame instead. Kept so existing calls and INI files keep working.
+    global _sock  # Uses the persistent module-level connection.
+    query = build_query(num_channels)  # Gets the prebuilt Modbus query (built once, then reused every poll).
     
     for attempt in range(max_retries):  # Loops for retries on failure.
         try:  # Starts a try block to handle any errors that might occur during network communication.
-            s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)  # Creates a new TCP socket for internet communication (AF_INET) in stream mode (reliable connection).
-            s.settimeout(3)  # Sets a timeout of 3 seconds for the socket operations, so it doesn't wait forever if there's no response.
-            s.connect((ip, port))  # Connects to the device's IP and port (like opening a phone line to the EDS4100).
-            s.send(query)  # Sends the Modbus query message to the device.
+            if _sock is None:  # Only connects when there is no open connection (first poll or after an error).
+                _sock = socket.create_connection((ip, port), timeout=3)  # Connects to the device's IP and port with a 3 second timeout for all socket operations (like opening a phone line to the EDS4100).
+                _sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)  # Disables Nagle's algorithm so the small query is sent immediately instead of being held back waiting for more data.
+            s = _sock  # Reuses the open connection for this poll.
+            s.sendall(query)  # Sends the Modbus query message to the device.
             
-            time.sleep(query_delay)  # Waits the configurable delay (e.g., 0.25 seconds) to give the device time to process and respond, as some devices need a short delay.
-            
-            response = s.recv(1024)  # Receives up to 1024 bytes of response from the device.
-            s.close()  # Closes the socket connection to free up resources.
+            # Read exactly one response frame instead of sleeping query_delay and hoping a single recv gets it all.
+            expected_length = 3 + num_channels * 2 + 2  # Header (slave, function, byte count) + data + CRC.
+            response = bytearray(expected_length)  # Preallocated buffer the response is received straight into.
+            view = memoryview(response)  # View on the buffer so each receive can fill the remaining part without copying.
+            received = 0  # Number of bytes received so far.
+            while received < expected_length:  # Keeps reading until the whole frame has arrived (the socket timeout still applies).
+                count = s.recv_into(view[received:expected_length])  # Receives directly into the unfilled part of the buffer.
+                if count == 0:  # The device closed the connection before sending the full frame.
+                    raise ConnectionError("Connection closed before full response")  # Raises an error to trigger retry.
+                received += count  # Adds the bytes just received.
+                if received >= 2 and response[1] & 0x80:  # Modbus exception responses are only 5 bytes long (slave, function, code, CRC).
+                    expected_length = 5  # Stops waiting once the short exception frame is complete.
+            view.release()  # Releases the view so the buffer can be trimmed.
+            del response[expected_length:]  # Trims the buffer to the frame actually received (only changes anything for exception responses).
             
             if len(response) < 5:  # Checks if the response is too short (less than 5 bytes), which means it's invalid.
                 raise ValueError("Short response")  # Raises an error to trigger retry.
@@ -63,8 +103,7 @@ def read_ntc_sensors(ip, port, query_delay, num_channels, scaling_factor, max_re
             # Verify response length and CRC for integrity
             if len(response) != 3 + response[2] + 2:  # Checks if the response length matches the expected structure (header + data + CRC).
                 raise ValueError("Invalid response length")  # Raises an error if length is incorrect.
-            calc_crc = modbus_crc(response[:-2])  # Recalculates CRC on the received data excluding the last 2 bytes.
-            if calc_crc != response[-2:]:  # Compares calculated CRC with received CRC.
+            if modbus_crc(response) != b'\x00\x00':  # Runs the CRC over the whole frame including the received CRC; a valid frame always gives zero, so no slice copy or separate compare of the last 2 bytes is needed.
                 raise ValueError("CRC mismatch")  # Raises an error if CRC does not match.
             
             slave, func, byte_count = response[0:3]  # Extracts the first 3 bytes: slave ID, function code, and byte count of data.
@@ -73,15 +112,17 @@ def read_ntc_sensors(ip, port, query_delay, num_channels, scaling_factor, max_re
                     return f"Error: Modbus exception code {response[2]}"  # Returns error message with exception code.
                 return "Error: Invalid response header. Verify slave ID (1) and function (03)."  # Returns error for invalid header.
             
-            data = response[3:3 + byte_count]  # Extracts the data bytes (temperature values).
-            raw_temperatures = []  # Creates an empty list to store the temperatures.
-            for i in range(0, len(data), 2):  # Loops through the data in steps of 2 (each temperature is 2 bytes).
-                val = int.from_bytes(data[i:i+2], 'big', signed=True) / scaling_factor  # Converts 2 bytes to a signed integer (big-endian), divides by scaling_factor (from INI).
-                raw_temperatures.append(val)  # Adds the temperature to the list.
+            decode = _decoders.get(num_channels)  # Looks up the compiled decoder for this channel count.
+            if decode is None:  # First read with this channel count.
+                decode = _decoders[num_channels] = struct.Struct(f'>{num_channels}h').unpack_from  # Compiles the format once: num_channels big-endian signed 16-bit integers.
+            values = decode(response, 3)  # Decodes all data bytes in one call straight from the receive buffer, starting right after the 3-byte header.
+            inv_scale = 1.0 / scaling_factor  # One division here instead of one per channel.
+            raw_temperatures = [val * inv_scale for val in values]  # Scales each value (scaling_factor from INI) to get °C.
             
             return raw_temperatures  # Returns the list of temperatures.
         
         except Exception as e:  # Catches any errors during the attempt.
+            close_connection()  # Drops the connection so the next attempt starts with a fresh one (and no half-read data).
             logging.warning(f"Read attempt {attempt+1} failed: {str(e)}. Retrying after {retry_backoff_base ** attempt} seconds.")  # Logs the warning with attempt number and error.
             if attempt < max_retries - 1:  # Checks if there are more retries left.
                 time.sleep(retry_backoff_base ** attempt)  # Exponential backoff: 1s, 2s, 4s, etc.
@@ -91,6 +132,7 @@ def read_ntc_sensors(ip, port, query_delay, num_channels, scaling_factor, max_re
 # Signal handler for graceful shutdown (e.g., Ctrl+C)
 def signal_handler(sig, frame):  # Defines a function to handle signals like SIGINT (Ctrl+C).
     logging.info("Script stopped by user or signal.")  # Logs the shutdown event.
+    close_connection()  # Closes the persistent connection to the EDS4100.
     print("Script stopped gracefully.")  # Prints a message to console.
     exit(0)  # Exits the script cleanly with status 0 (success).
 
@@ -133,27 +175,26 @@ except Exception as e:  # Catches errors like file not found, missing keys, or i
     num_channels = 24  # Default number of channels if INI fails.
     abs_deviation_threshold = 2.0  # Default absolute deviation threshold if INI fails.
 
+deviation_pct_label = f"{deviation_threshold*100:.0f}%"  # Relative deviation threshold as a percentage string, formatted once here instead of in every deviation alert.
+
 # Setup logging to file for persistent records
 logging.basicConfig(filename='battery_log.txt', level=logging.INFO, format='%(asctime)s - %(message)s')  # Configures logging to write INFO level and above to 'battery_log.txt' with timestamp format.
 
 # Attach signal handler for Ctrl+C (SIGINT) for graceful exit
 signal.signal(signal.SIGINT, signal_handler)  # Registers the signal_handler function to run on SIGINT (Ctrl+C), ensuring clean shutdown.
 
-previous_temps = None  # To store previous calibrated readings for rise/disconnection detection.
-previous_median = None  # To store previous median for group rise check.
-run_count = 0  # Counter to skip detection on first run.
-alert_states = {ch: {'last_type': None, 'count': 0} for ch in range(1, num_channels + 1)}  # Track per-channel alert states to suppress repeats.
-startup_offsets = None  # To store per-channel offsets calculated at startup.
-startup_median = None  # To store the startup median for reference.
-startup_set = False  # Flag to indicate if startup calibration has been set.
-
 def draw_ascii_gui(calibrated_temps, alerts, current_median, startup_median, raw_temps, offsets, is_set):  # Function to "draw" an ASCII-based "GUI" in the terminal using formatted print statements.
-    os.system('cls' if os.name == 'nt' else 'clear')  # Clears the terminal screen for a "refresh" effect (cls for Windows, clear for Unix-like).
+    lines = []  # Collects every line of the screen so it can be written out in one go instead of one print per line.
+    if os.name == 'nt':  # Windows console.
+        os.system('cls')  # Clears the terminal screen for a "refresh" effect.
+        clear_code = ""  # Nothing extra to write.
+    else:  # Unix-like terminals.
+        clear_code = "\033[2J\033[H"  # ANSI codes that clear the screen and move the cursor home, written with the frame instead of starting a separate 'clear' process.
     
     # Battery Status Section - Prints a table-like ASCII box for channel statuses.
-    print("+-------------------------------- Battery Temperature Monitor --------------------------------+")  # Prints the header for the monitor.
-    print("| Ch |     Raw (°C)     |   Offset (°C)   | Calibrated (°C) |")  # Prints the column headers for the table.
-    print("+----+------------------+-----------------+-----------------+")  # Prints the separator line for the table.
+    lines.append("+-------------------------------- Battery Temperature Monitor --------------------------------+")  # Adds the header for the monitor.
+    lines.append("| Ch |     Raw (°C)     |   Offset (°C)   | Calibrated (°C) |")  # Adds the column headers for the table.
+    lines.append("+----+------------------+-----------------+-----------------+")  # Adds the separator line for the table.
     for ch in range(1, num_channels + 1):  # Loops through channels.
         raw = raw_temps[ch-1]  # Gets the raw temperature for the channel.
         raw_str = f"{raw:.1f}" if raw > valid_min else "Invalid"  # Formats raw temp as string if valid, else "Invalid".
@@ -163,30 +204,32 @@ def draw_ascii_gui(calibrated_temps, alerts, current_median, startup_median, raw
             offset_str = "N/A"  # Sets offset string to "N/A".
         calib = calibrated_temps[ch-1]  # Gets the calibrated temperature.
         calib_str = f"{calib:.1f}" if calib is not None else "Invalid"  # Formats calibrated temp as string if valid, else "Invalid".
-        print(f"| {ch:2d} | {raw_str:16} | {offset_str:15} | {calib_str:15} |")  # Prints the row for the channel.
-    print("+----+------------------+-----------------+-----------------+")  # Prints the closing separator for the table.
+        lines.append(f"| {ch:2d} | {raw_str:16} | {offset_str:15} | {calib_str:15} |")  # Adds the row for the channel.
+    lines.append("+----+------------------+-----------------+-----------------+")  # Adds the closing separator for the table.
     
     # Median Info
     startup_str = f"{startup_median:.1f} °C" if is_set else "Not set"  # Formats startup median string if set, else "Not set".
-    print(f"| Current Median: {current_median:.1f} °C | Startup Median: {startup_str:10} |")  # Prints current and startup median.
-    print("+---------------------------------------------------------------------------+")  # Prints separator for median section.
+    lines.append(f"| Current Median: {current_median:.1f} °C | Startup Median: {startup_str:10} |")  # Adds current and startup median.
+    lines.append("+---------------------------------------------------------------------------+")  # Adds separator for median section.
     
     # Alerts Section - Prints alerts in a box.
-    print("| Alerts:                                                                   |")  # Prints alerts header.
-    print("+---------------------------------------------------------------------------+")  # Prints separator for alerts.
+    lines.append("| Alerts:                                                                   |")  # Adds alerts header.
+    lines.append("+---------------------------------------------------------------------------+")  # Adds separator for alerts.
     if alerts:  # If there are alerts.
         for alert in alerts:  # Loops through alerts.
-            print(f"| {alert} |")  # Prints each alert in a "box" line.
+            lines.append(f"| {alert} |")  # Adds each alert in a "box" line.
     else:  # If no alerts.
-        print("| No alerts.                                                                |")  # Prints no alerts message.
-    print("+---------------------------------------------------------------------------+")  # Prints closing separator for alerts.
+        lines.append("| No alerts.                                                                |")  # Adds no alerts message.
+    lines.append("+---------------------------------------------------------------------------+")  # Adds closing separator for alerts.
     
     # Current Alert Section - Highlights the first (most recent) alert or "no active".
     if alerts:  # If there are alerts.
-        print(f"| Current Active Alert: {alerts[0]} |")  # Prints the first alert as current active.
+        lines.append(f"| Current Active Alert: {alerts[0]} |")  # Adds the first alert as current active.
     else:  # If no alerts.
-        print("| Current Active Alert: No active alerts.                                   |")  # Prints no active alerts message.
-    print("+---------------------------------------------------------------------------+")  # Prints closing separator for current alert.
+        lines.append("| Current Active Alert: No active alerts.                                   |")  # Adds no active alerts message.
+    lines.append("+---------------------------------------------------------------------------+")  # Adds closing separator for current alert.
+    
+    print(clear_code + "\n".join(lines), flush=True)  # Writes the whole screen with a single print.
 
 def check_invalid_reading(raw, ch, alerts):  # Helper to check and alert on invalid readings.
     if raw <= valid_min:  # If the reading is invalid (0 or negative).
@@ -206,24 +249,17 @@ def check_deviation(calibrated, current_median, ch, alerts):  # Helper to check
     abs_dev = abs(calibrated - current_median)  # Calculates absolute deviation.
     rel_dev = abs_dev / abs(current_median) if current_median != 0 else 0  # Calculates relative deviation.
     if abs_dev > abs_deviation_threshold or rel_dev > deviation_threshold:  # If either exceeds threshold.
-        alerts.append({'channel': ch, 'type': 'deviation', 'message': f"Channel {ch}: Alert - Deviation from current median (abs {abs_dev:.1f} °C > {abs_deviation_threshold} °C or {rel_dev:.2%} > {deviation_threshold*100:.0f}%), possible charging/discharging issue or abnormal heating."})  # Adds deviation alert.
+        alerts.append({'channel': ch, 'type': 'deviation', 'message': f"Channel {ch}: Alert - Deviation from current median (abs {abs_dev:.1f} °C > {abs_deviation_threshold} °C or {rel_dev:.2%} > {deviation_pct_label}), possible charging/discharging issue or abnormal heating."})  # Adds deviation alert.
 
-def check_abnormal_rise(current, previous_temps, ch, alerts, poll_interval, rise_threshold):  # Helper to check and alert on abnormal temperature rise.
-    previous = previous_temps[ch-1]  # Gets previous calibrated temperature.
-    if previous is not None:  # If previous is valid.
-        rise = current - previous  # Calculate channel-specific rise.
-        if rise > rise_threshold:  # If rise exceeds threshold (e.g., 2°C per poll).
-            alerts.append({'channel': ch, 'type': 'rise', 'message': f"Channel {ch}: Alert - Abnormal temperature rise ({rise:.1f} °C in {poll_interval}s). Check battery!"})  # Adds rise alert.
+def check_abnormal_rise(rise, ch, alerts, poll_interval, rise_threshold):  # Helper to check and alert on abnormal temperature rise (rise = current minus previous calibrated temperature).
+    if rise > rise_threshold:  # If rise exceeds threshold (e.g., 2°C per poll).
+        alerts.append({'channel': ch, 'type': 'rise', 'message': f"Channel {ch}: Alert - Abnormal temperature rise ({rise:.1f} °C in {poll_interval}s). Check battery!"})  # Adds rise alert.
 
-def check_group_tracking_lag(current, previous_temps, median_rise, ch, alerts, disconnection_lag_threshold):  # Helper to check and alert on temperature not tracking group rise.
-    previous = previous_temps[ch-1]  # Gets previous calibrated temperature.
-    if previous is not None:  # If previous is valid.
-        rise = current - previous  # Calculate channel-specific rise.
-        if abs(rise - median_rise) > disconnection_lag_threshold:  # If channel rise deviates from group rise.
-            alerts.append({'channel': ch, 'type': 'lag', 'message': f"Channel {ch}: Alert - Temperature not tracking group (channel rise {rise:.1f} °C vs group {median_rise:.1f} °C). Possible disconnection or fault."})  # Adds lag/disconnection alert.
+def check_group_tracking_lag(rise, median_rise, ch, alerts, disconnection_lag_threshold):  # Helper to check and alert on temperature not tracking group rise.
+    if abs(rise - median_rise) > disconnection_lag_threshold:  # If channel rise deviates from group rise.
+        alerts.append({'channel': ch, 'type': 'lag', 'message': f"Channel {ch}: Alert - Temperature not tracking group (channel rise {rise:.1f} °C vs group {median_rise:.1f} °C). Possible disconnection or fault."})  # Adds lag/disconnection alert.
 
-def check_sudden_disconnection(current, previous_temps, ch, alerts):  # Helper to check and alert on sudden disconnection.
-    previous = previous_temps[ch-1]  # Gets previous calibrated temperature.
+def check_sudden_disconnection(current, previous, ch, alerts):  # Helper to check and alert on sudden disconnection.
     if previous is not None and current is None:  # If previous was valid but current is invalid.
         alerts.append({'channel': ch, 'type': 'sudden_disconnect', 'message': f"Channel {ch}: Alert - Sudden disconnection (was valid {previous:.1f} °C, now invalid). Check sensor/wiring."})  # Adds sudden disconnection alert.
 
@@ -231,11 +267,12 @@ def check_sudden_disconnection(current, previous_temps, ch, alerts):  # Helper t
 previous_temps = None  # To store previous calibrated readings for rise/disconnection detection.
 previous_median = None  # To store previous median for group rise check.
 run_count = 0  # Counter to skip detection on first run.
-alert_states = {ch: {'last_type': None, 'count': 0} for ch in range(1, num_channels + 1)}  # Track per-channel alert states to suppress repeats.
 startup_offsets = None  # To store per-channel offsets calculated at startup.
 startup_median = None  # To store the startup median for reference.
 startup_set = False  # Flag to indicate if startup calibration has been set.
 
+gc.set_threshold(10000, 50, 10)  # Raises the automatic garbage collection threshold so the small per-poll allocations don't trigger frequent collections.
+
 while True:  # Infinite loop to keep reading temperatures every poll_interval seconds for ongoing operation.
     result = read_ntc_sensors(ip, port, query_delay, num_channels, scaling_factor, max_retries, retry_backoff_base)  # Calls the function to read the sensors with retries.
 
@@ -244,8 +281,9 @@ while True:  # Infinite loop to keep reading temperatures every poll_interval se
         print(result)  # Prints the error to console.
         draw_ascii_gui([None] * num_channels, [result], 0.0, startup_median if startup_median is not None else 0.0, [valid_min] * num_channels, startup_offsets, startup_set)  # Draws GUI with error as alert.
     else:  # If successful reading, process the data.
-        # Count valid readings
-        valid_count = sum(1 for t in result if t > valid_min)  # Counts valid readings.
+        # Collect and count valid readings
+        valid_raw = [t for t in result if t > valid_min]  # Valid raw readings (reused below as the median input when calibration is not set).
+        valid_count = len(valid_raw)  # Counts valid readings.
         
         # Set startup calibration if not set and all channels are valid
         if not startup_set and valid_count == num_channels:  # Checks if calibration not set and all valid.
@@ -263,7 +301,7 @@ while True:  # Infinite loop to keep reading temperatures every poll_interval se
         else:  # If there are valid temperatures.
             # Apply calibration if set, else use raw
             if startup_set:  # If calibration is set.
-                calibrated_temps = [result[i] + startup_offsets[i] if result[i] > valid_min else None for i in range(num_channels)]  # Applies offsets to valid readings.
+                calibrated_temps = [raw + offset if raw > valid_min else None for raw, offset in zip(result, startup_offsets)]  # Applies offsets to valid readings.
             else:  # If not set.
                 calibrated_temps = [raw if raw > valid_min else None for raw in result]  # Uses raw values for calibrated temps.
                 if run_count == 0:  # Only on the first poll.
@@ -272,7 +310,7 @@ while True:  # Infinite loop to keep reading temperatures every poll_interval se
                     print(msg)  # Prints the warning.
             
             # Filter valid calibrated temperatures
-            valid_temps = [t for t in calibrated_temps if t is not None]  # Filters out None for valid calibrated temps.
+            valid_temps = [t for t in calibrated_temps if t is not None] if startup_set else valid_raw  # Filters out None for valid calibrated temps (without calibration these are just the valid raw readings).
             
             # Compute current median
             current_median = statistics.median(valid_temps)  # Calculates the median of valid calibrated temperatures.
@@ -280,12 +318,18 @@ while True:  # Infinite loop to keep reading temperatures every poll_interval se
             
             alerts = []  # List to store any warnings as dicts.
             
+            # Deviation limit for this poll: a channel alerts if it is off by more than the absolute OR the relative threshold, i.e. more than the smaller of the two.
+            deviation_limit = min(abs_deviation_threshold, deviation_threshold * abs(current_median)) if current_median != 0 else abs_deviation_threshold  # Computed once per poll instead of a divide per channel.
+            
             for ch, raw in enumerate(result, start=1):  # Loops through each channel's raw temperature.
                 if check_invalid_reading(raw, ch, alerts):  # Check for invalid reading.
                     continue  # Skip further checks for this channel.
                 
                 calibrated = calibrated_temps[ch-1]  # Get calibrated value
                 
+                if low_threshold <= calibrated <= high_threshold and abs(calibrated - current_median) <= deviation_limit:  # Fast path: channel is within all limits (the usual case), so there is nothing to check or format.
+                    continue  # Skip the alert helpers for this channel.
+                
                 check_high_temp(calibrated, ch, alerts)  # Check for high temperature on calibrated.
                 check_low_temp(calibrated, ch, alerts)  # Check for low temperature on calibrated.
                 
@@ -294,11 +338,15 @@ while True:  # Infinite loop to keep reading temperatures every poll_interval se
             # Abnormal temperature rise/detection (after first run) - checks for changes since last poll.
             if run_count > 0 and previous_temps is not None and previous_median is not None:  # Only if not the first run and previous data exists.
                 median_rise = current_median - previous_median  # Calculate group (median) rise since last poll.
-                for ch, calibrated in enumerate(calibrated_temps, start=1):  # Loops through each channel.
-                    if calibrated is not None:  # Only check if current is valid.
-                        check_abnormal_rise(calibrated, previous_temps, ch, alerts, poll_interval, rise_threshold)  # Check for abnormal rise.
-                        check_group_tracking_lag(calibrated, previous_temps, median_rise, ch, alerts, disconnection_lag_threshold)  # Check for group tracking lag.
-                    check_sudden_disconnection(calibrated, previous_temps, ch, alerts)  # Check for sudden disconnection.
+                for ch, (calibrated, previous) in enumerate(zip(calibrated_temps, previous_temps), start=1):  # Loops through each channel with its current and previous value side by side.
+                    if previous is None:  # Nothing to compare against if the channel was invalid last poll.
+                        continue  # Skip to the next channel.
+                    if calibrated is None:  # Was valid, now invalid.
+                        check_sudden_disconnection(calibrated, previous, ch, alerts)  # Check for sudden disconnection.
+                        continue  # No rise to compute for an invalid reading.
+                    rise = calibrated - previous  # Channel-specific rise, computed once and shared by both checks.
+                    check_abnormal_rise(rise, ch, alerts, poll_interval, rise_threshold)  # Check for abnormal rise.
+                    check_group_tracking_lag(rise, median_rise, ch, alerts, disconnection_lag_threshold)  # Check for group tracking lag.
             
             # Update previous for next loop - saves current calibrated values and median for the next poll's comparisons.
             previous_temps = calibrated_temps[:]  # Copy list (None for invalids)
@@ -310,5 +358,6 @@ while True:  # Infinite loop to keep reading temperatures every poll_interval se
             draw_ascii_gui(calibrated_temps, current_alerts, current_median, startup_median if startup_median is not None else 0.0, result, startup_offsets, startup_set)  # Calls the ASCII "GUI" function to print the formatted display.
     
     run_count += 1  # Increment the run counter after processing.
-    gc.collect()  # Manually collects garbage to free memory, preventing leaks in long runs.
+    if run_count % 360 == 0:  # Occasional full collection (about once an hour at a 10 s poll) as a safety net instead of every poll; the loop creates no reference cycles.
+        gc.collect()  # Full garbage collection.
     time.sleep(poll_interval)  # Waits the configurable poll interval before the next loop iteration.
\ No newline at end of file
@@ -2,24 +2,23 @@ import smbus
 import time
 import configparser
 import RPi.GPIO as GPIO
-import smtplib
-from email.mime.text import MIMEText
 import curses
 import logging
 import sys
-import os
 import signal
+import threading
+import queue
 from art import text2art  # Importing the art library
 
-# Load settings from config.ini
-config = configparser.ConfigParser()
-config.read('config.ini')
+# Load settings from config.ini (parsed once here; load_settings builds the settings from it)
+raw_config = configparser.ConfigParser()
+config_files_read = raw_config.read('config.ini')
 
 # Setup logging for tracking what's happening
 # Set logging level from config file
-logging_level = getattr(logging, config['General']['LoggingLevel'].upper(), None)
+logging_level = getattr(logging, raw_config['General']['LoggingLevel'].upper(), None)
 if not isinstance(logging_level, int):
-    raise ValueError('Invalid log level: %s' % config['General']['LoggingLevel'])
+    raise ValueError('Invalid log level: %s' % raw_config['General']['LoggingLevel'])
 logging.basicConfig(level=logging_level, 
                     format='%(asctime)s - %(levelname)s - %(message)s',
                     filename='battery_balancer.log',
@@ -40,13 +39,18 @@ Configuration:
 - Logs what's happening or any issues to 'battery_balancer.log'.
 """
 
+# ADS1115 samples per second, indexed by the data rate bits (7:5) of its config register
+ADS1115_DATA_RATES = (8, 16, 32, 64, 128, 250, 475, 860)
+# ADS1115 full-scale voltage, indexed by the PGA bits (11:9) of its config register
+ADS1115_FULL_SCALE = (6.144, 4.096, 2.048, 1.024, 0.512, 0.256, 0.256, 0.256)
+
 def load_settings():
     """
     Load all the settings from a configuration file.
     This makes sure we know how to handle the batteries correctly.
     """
-    config = configparser.ConfigParser()
-    if not config.read('config.ini'):
+    config = raw_config  # Already read at startup, no need to parse the file again
+    if not config_files_read:
         logging.error("Couldn't read the config file!")
         raise FileNotFoundError("We can't find or read the config file!")
     
@@ -94,6 +98,21 @@ def load_settings():
             }
         }
 
+        # Combine the ADC mode, rate and gain bits once so setup_voltage_meter can write them directly
+        settings['ADC']['ConfigValue'] = (settings['ADC']['ContinuousModeConfig'] |
+                                          settings['ADC']['SampleRateConfig'] |
+                                          settings['ADC']['GainConfig'])
+        # How long one conversion takes. write_word_data sends the low byte first, so the ADC
+        # stores ConfigValue with its bytes swapped; take the rate bits from that swapped value.
+        stored_config = (settings['ADC']['ConfigValue'] & 0xFF) << 8 | (settings['ADC']['ConfigValue'] >> 8)
+        settings['ADC']['ConversionDelay'] = 1.0 / ADS1115_DATA_RATES[(stored_config >> 5) & 0x07] + 0.001
+        # Full-scale voltage of the gain the ADC actually runs at (same swapped value)
+        settings['ADC']['FullScaleVoltage'] = ADS1115_FULL_SCALE[(stored_config >> 9) & 0x07]
+        # Volts per ADC count for each sensor: full scale / 32767, back through the divider, times calibration
+        settings['Calibration']['VoltsPerCount'] = tuple(
+            (settings['ADC']['FullScaleVoltage'] / 32767) / settings['General']['VoltageDividerRatio'] * settings['Calibration'][f'Sensor{sensor_id}_Calibration']
+            for sensor_id in (1, 2, 3))
+
         # Check if our balance threshold makes sense
         if settings['General']['VoltageDifferenceToBalance'] <= 0:
             raise ValueError("The voltage difference for balancing must be positive.")
@@ -106,8 +125,30 @@ def load_settings():
 # Global variables to keep track of things
 config = None
 bus = None
-last_email_time = 0
+last_email_time = None  # time.monotonic() of the last alert email (None = none sent yet)
 balance_start_time = None  # Track when balancing begins
+current_channel = None  # Multiplexer channel last selected (None = unknown)
+configured_channels = set()  # Multiplexer channels whose ADC has already been configured
+bus_lock = threading.Lock()  # Only one thread talks on the I2C bus at a time
+readings_lock = threading.Lock()  # Guards latest_readings
+latest_readings = {}  # Newest (voltage, readings, raw ADC values) per battery, filled by the poller thread
+first_poll_done = threading.Event()  # Set once every battery has been read at least once
+email_queue = queue.Queue()  # Alert emails waiting for the email thread
+email_thread = None  # Background thread that sends alert emails (started on first alert)
+running = True  # Cleared by SIGINT/SIGTERM so the loops finish their current step and stop
+SMTP_IDLE_SECONDS = 60  # Hang up the kept-open SMTP connection after this long without mail
+
+# Relay bit patterns for each (high, low) battery pair, 1-indexed.
+# Bit 0 = relay 1, bit 1 = relay 2, bit 2 = relay 3, bit 3 = relay 4
+# (actual setup might differ based on hardware)
+RELAY_STATES = {
+    (2, 1): 0b0001,  # Relay 1
+    (3, 1): 0b0011,  # Relays 1 and 2
+    (1, 2): 0b0100,  # Relay 3
+    (1, 3): 0b1100,  # Relays 3 and 4
+    (2, 3): 0b1101,  # Relays 1, 3 and 4
+    (3, 2): 0b0111,  # Relays 1, 2 and 3
+}
 
 def setup_hardware():
     """
@@ -115,12 +156,17 @@ def setup_hardware():
     This includes setting up communication with devices and configuring GPIO pins.
     """
     global bus, config
+    if bus is not None:
+        logging.debug("Hardware already set up; skipping.")
+        return  # Already done: don't reopen the bus or start a second poller thread
     try:
         config = load_settings()
         bus = smbus.SMBus(config['General']['I2C_BusNumber'])
         GPIO.setmode(GPIO.BCM)
         GPIO.setup(config['GPIO']['DC_DC_RelayPin'], GPIO.OUT)
         GPIO.setup(config['GPIO']['AlarmRelayPin'], GPIO.OUT, initial=GPIO.LOW)
+        # Read voltages in the background so the screen never waits on the I2C bus
+        threading.Thread(target=poll_voltages, daemon=True).start()
         logging.info("All hardware is set up and ready!")
     except Exception as e:
         logging.critical(f"Problem setting up hardware: {e}")
@@ -129,29 +175,80 @@ def setup_hardware():
 def choose_channel(channel):
     """
     Pick which channel on the I2C multiplexer we want to talk to.
+    Does nothing if that channel is already selected.
     
     Args:
         channel (int): Which channel to talk to (numbered from 0).
+
+    Returns:
+        bool: True if the channel is selected, False if the multiplexer couldn't be switched.
     """
+    global current_channel
+    if channel == current_channel:
+        return True
     try:
-        logging.debug(f"Attempting to select channel {channel}")
+        logging.debug("Attempting to select channel %s", channel)
         bus.write_byte(config['I2C']['MultiplexerAddress'], 1 << channel)
-        logging.debug(f"Successfully switched to channel {channel}")
+        current_channel = channel
+        logging.debug("Successfully switched to channel %s", channel)
+        return True
     except IOError as e:
+        current_channel = None  # Unknown after an error, so select again next time
         logging.error(f"Trouble selecting channel {channel}: {e}")
+        return False
 
 def setup_voltage_meter():
     """
     Set up the ADC to measure battery voltage correctly.
+    The ADC on the current channel keeps this setup, so it is only written once per channel.
+
+    Returns:
+        bool: True if the meter is set up, False if writing its config failed.
     """
-    config_value = (config['ADC']['ContinuousModeConfig'] | 
-                    config['ADC']['SampleRateConfig'] | 
-                    config['ADC']['GainConfig'])
+    if current_channel in configured_channels:
+        return True
     try:
-        bus.write_word_data(config['I2C']['VoltageMeterAddress'], config['ADC']['ConfigRegister'], config_value)
+        bus.write_word_data(config['I2C']['VoltageMeterAddress'], config['ADC']['ConfigRegister'], config['ADC']['ConfigValue'])
+        if current_channel is not None:
+            configured_channels.add(current_channel)
         logging.debug("Voltage meter is now configured")
+        return True
     except IOError as e:
         logging.error(f"Couldn't set up the voltage meter: {e}")
+        return False
+
+def read_raw_adc(meter_address, conversion_register):
+    """
+    Read the latest conversion from the ADC on the current channel.
+
+    Returns:
+        int: Raw ADC value.
+    """
+    # Read ADC value in little endian format
+    raw_adc = bus.read_word_data(meter_address, conversion_register)
+    # Ensure we're using little endian by swapping bytes if necessary
+    return (raw_adc & 0xFF) << 8 | (raw_adc >> 8)  # Swap bytes for little endian
+
+def consistent_average(readings, raw_values, allowed_difference):
+    """
+    Average a set of readings if they agree with each other.
+
+    Args:
+        readings (list): Actual voltage readings.
+        raw_values (list): Raw ADC values matching the readings.
+        allowed_difference (float): How much variation we allow in readings.
+
+    Returns:
+        tuple: (average_actual_voltage, valid readings, valid raw ADC values) or None if the readings don't agree.
+    """
+    if readings:
+        average = sum(readings) / len(readings)
+        if average == 0.0 or all(abs(r - average) / (average if average != 0 else 1) <= allowed_difference for r in readings):
+            valid_readings = [r for r in readings if abs(r - average) / (average if average != 0 else 1) <= 0.05]
+            valid_adc = [raw_values[i] for i, r in enumerate(readings) if abs(r - average) / (average if average != 0 else 1) <= 0.05]
+            if valid_readings:
+                return sum(valid_readings) / len(valid_readings), valid_readings, valid_adc
+    return None
 
 def read_voltage_with_retry(battery_id, number_of_samples=2, allowed_difference=0.01, max_attempts=2):
     """
@@ -166,63 +263,152 @@ def read_voltage_with_retry(battery_id, number_of_samples=2, allowed_difference=
     Returns:
         tuple: (average_actual_voltage, list of actual voltage readings, list of raw ADC values) or (None, [], []) if it fails.
     """
-    voltage_divider_ratio = config['General']['VoltageDividerRatio']
     sensor_id = (battery_id - 1) % 3 + 1  # Assuming each battery is associated with a sensor in sequence
-    calibration_factor = config['Calibration'][f'Sensor{sensor_id}_Calibration']
+    # Look these up once instead of on every sample
+    meter_address = config['I2C']['VoltageMeterAddress']
+    conversion_register = config['ADC']['ConversionRegister']
+    conversion_delay = config['ADC']['ConversionDelay']
+    volts_per_count = config['Calibration']['VoltsPerCount'][sensor_id - 1]  # Scaling, divider and calibration combined
     for attempt in range(max_attempts):
         try:
             readings = []
             raw_values = []
-            for _ in range(number_of_samples):
+            # Hold the bus for the whole read so the relay code can't switch channels mid-read
+            with bus_lock:
+                # All samples come from the same meter, so select and set it up once
                 meter_channel = (battery_id - 1) % 3  # Adjust for 1-indexed batteries
-                choose_channel(meter_channel)
-                
-                # Increased setup attempt in case of initial failure
-                for setup_attempt in range(3):
-                    try:
-                        setup_voltage_meter()
-                        break  # success, exit loop
-                    except IOError:
-                        if setup_attempt == 2:  # all attempts failed
-                            raise
-                        time.sleep(0.01)  # wait before next attempt
-                
-                bus.write_byte(config['I2C']['VoltageMeterAddress'], 0x01)  # Start conversion
-                time.sleep(0.05)  # Decreased delay for faster readings
-                
-                # Read ADC value in little endian format
-                raw_adc = bus.read_word_data(config['I2C']['VoltageMeterAddress'], config['ADC']['ConversionRegister'])
-                # Ensure we're using little endian by swapping bytes if necessary
-                raw_adc = (raw_adc & 0xFF) << 8 | (raw_adc >> 8)  # Swap bytes for little endian
+                if not choose_channel(meter_channel):
+                    # Reading now would return whichever meter the multiplexer is still on
+                    logging.warning(f"Skipping voltage read for Battery {battery_id}: couldn't select channel {meter_channel}")
+                    continue
+                # A meter set up on an earlier read has kept converting since, so its first result is already fresh
+                meter_running = current_channel in configured_channels
+                if not setup_voltage_meter():
+                    logging.warning(f"Skipping voltage read for Battery {battery_id}: voltage meter isn't set up")
+                    continue
+                for sample in range(number_of_samples):
+                    # No separate pointer write needed: read_word_data points at the conversion register itself
+                    if sample or not meter_running:
+                        time.sleep(conversion_delay)  # One conversion period, so each sample is a fresh reading
+                    raw_adc = read_raw_adc(meter_address, conversion_register)
                 
-                logging.debug(f"Raw ADC value for Battery {battery_id} (Sensor {sensor_id}): {raw_adc}")
+                    logging.debug("Raw ADC value for Battery %s (Sensor %s): %s", battery_id, sensor_id, raw_adc)
                 
-                if raw_adc != 0:
-                    measured_voltage = raw_adc * (6.144 / 32767)  # Measured voltage after divider
-                    actual_voltage = (measured_voltage / voltage_divider_ratio) * calibration_factor  # Apply calibration factor here
-                    readings.append(actual_voltage)
-                    raw_values.append(raw_adc)
-                else:
-                    readings.append(0.0)
-                    raw_values.append(0)
-
-            if readings:
-                average = sum(readings) / len(readings)
-                if average == 0.0 or all(abs(r - average) / (average if average != 0 else 1) <= allowed_difference for r in readings):
-                    valid_readings = [r for r in readings if abs(r - average) / (average if average != 0 else 1) <= 0.05]
-                    valid_adc = [raw_values[i] for i, r in enumerate(readings) if abs(r - average) / (average if average != 0 else 1) <= 0.05]
-                    if valid_readings:
-                        return sum(valid_readings) / len(valid_readings), valid_readings, valid_adc
-                else:
-                    logging.debug(f"Readings for Battery {battery_id} (Sensor {sensor_id}) aren't consistent, trying again.")
+                    if raw_adc != 0:
+                        actual_voltage = raw_adc * volts_per_count  # Scaling, divider and calibration in one multiply
+                        readings.append(actual_voltage)
+                        raw_values.append(raw_adc)
+                    else:
+                        readings.append(0.0)
+                        raw_values.append(0)
+
+            result = consistent_average(readings, raw_values, allowed_difference)
+            if result is not None:
+                return result
+            logging.debug(f"Readings for Battery {battery_id} (Sensor {sensor_id}) aren't consistent, trying again.")
         except IOError as e:
             logging.warning(f"Couldn't read voltage for Battery {battery_id} (Sensor {sensor_id}): {e}")
+            configured_channels.discard((battery_id - 1) % 3)  # The meter may have reset, so set it up again
             continue
         time.sleep(0.01)  # Reduced from 5, adjust as needed
 
     logging.error(f"Couldn't get a good voltage reading for Battery {battery_id} (Sensor {sensor_id}) after {max_attempts} tries")
     return None, [], []
 
+def read_all_batteries(number_of_samples=2, allowed_difference=0.01, max_attempts=2):
+    """
+    Read every battery in one pass over the multiplexer.
+    Each channel has its own ADC converting all the time, so one conversion wait per sample covers every battery
+    instead of waiting once per battery, and the first sample needs no wait once the meters are running. Batteries whose readings fail or disagree are retried one at a time.
+
+    Args:
+        number_of_samples (int): How many readings to take per battery.
+        allowed_difference (float): How much variation we allow in readings.
+        max_attempts (int): How many times to retry a battery whose readings are inconsistent.
+
+    Returns:
+        dict: Battery number -> (average_actual_voltage, readings, raw ADC values), (None, [], []) for failures.
+    """
+    battery_ids = range(1, config['General']['NumberOfBatteries'] + 1)
+    meter_address = config['I2C']['VoltageMeterAddress']
+    conversion_register = config['ADC']['ConversionRegister']
+    conversion_delay = config['ADC']['ConversionDelay']
+    sensor_volts_per_count = config['Calibration']['VoltsPerCount']
+    readings = {battery_id: [] for battery_id in battery_ids}
+    raw_values = {battery_id: [] for battery_id in battery_ids}
+    failed = set()
+
+    with bus_lock:
+        # Make sure every meter is set up before the first wait, so all of them are converting during it
+        meters_running = True  # Stays True if every meter was already converting from an earlier pass
+        for battery_id in battery_ids:
+            if not choose_channel((battery_id - 1) % 3):
+                failed.add(battery_id)
+                continue
+            if current_channel not in configured_channels:
+                meters_running = False
+            if not setup_voltage_meter():
+                logging.warning(f"Couldn't set up the voltage meter for Battery {battery_id}")
+                failed.add(battery_id)
+        for sample in range(number_of_samples):
+            if sample or not meters_running:
+                time.sleep(conversion_delay)  # One wait for all meters, so each sample is a fresh reading
+            for battery_id in battery_ids:
+                if battery_id in failed:
+                    continue
+                if not choose_channel((battery_id - 1) % 3):
+                    failed.add(battery_id)  # Reading now would return another channel's meter
+                    continue
+                try:
+                    raw_adc = read_raw_adc(meter_address, conversion_register)
+                except IOError as e:
+                    logging.warning(f"Couldn't read voltage for Battery {battery_id}: {e}")
+                    configured_channels.discard((battery_id - 1) % 3)  # The meter may have reset, so set it up again
+                    failed.add(battery_id)
+                    continue
+                logging.debug("Raw ADC value for Battery %s: %s", battery_id, raw_adc)
+                readings[battery_id].append(raw_adc * sensor_volts_per_count[(battery_id - 1) % 3] if raw_adc != 0 else 0.0)
+                raw_values[battery_id].append(raw_adc)
+
+    results = {}
+    for battery_id in battery_ids:
+        result = None
+        if battery_id not in failed:
+            result = consistent_average(readings[battery_id], raw_values[battery_id], allowed_difference)
+        if result is None:
+            # Fall back to reading this battery on its own (takes the bus lock itself)
+            result = read_voltage_with_retry(battery_id, number_of_samples, allowed_difference, max_attempts)
+        results[battery_id] = result
+    return results
+
+def poll_voltages():
+    """
+    Keep reading every battery in the background and store the newest results in latest_readings.
+    Runs until shutdown in its own thread, started by setup_hardware.
+    """
+    while running:
+        try:
+            results = read_all_batteries(number_of_samples=2, max_attempts=2)
+        except Exception as e:
+            logging.error(f"Unexpected error reading the batteries: {e}")
+            results = {battery_id: (None, [], []) for battery_id in range(1, config['General']['NumberOfBatteries'] + 1)}
+        with readings_lock:
+            latest_readings.update(results)
+        first_poll_done.set()
+        time.sleep(config['General']['SleepTimeBetweenChecks'])
+
+def get_latest_reading(battery_id):
+    """
+    Get the newest reading for a battery from the poller thread.
+
+    Args:
+        battery_id (int): Which battery (starts from 1).
+
+    Returns:
+        tuple: (average_actual_voltage, list of actual voltage readings, list of raw ADC values) or (None, [], []) if not read yet.
+    """
+    with readings_lock:
+        return latest_readings.get(battery_id, (None, [], []))
 
 def set_relay_connection(high_voltage_battery, low_voltage_battery):
     """
@@ -234,44 +420,17 @@ def set_relay_connection(high_voltage_battery, low_voltage_battery):
     """
     try:
         logging.info(f"Attempting to set relay for connection from Battery {high_voltage_battery} to {low_voltage_battery}")
-        logging.debug("Switching to relay control channel.")
-        choose_channel(3)  # Select channel 3 for relay operations
-        relay_state = 0
-        logging.debug(f"Initial relay state: {bin(relay_state)}")
-
-        if high_voltage_battery == low_voltage_battery or high_voltage_battery < 1 or low_voltage_battery < 1:
+        # Look up the relay pattern for this pair; unknown pairs (including 0, 0) leave all relays off
+        relay_state = RELAY_STATES.get((high_voltage_battery, low_voltage_battery), 0)
+        if relay_state == 0:
             logging.debug("No need for relay activation; all relays off.")
-            relay_state = 0  # All relays off, cell 1 links to cell 1
-        else:
-            # Relay mapping (actual setup might differ based on hardware)
-            if high_voltage_battery == 2 and low_voltage_battery == 1:
-                relay_state |= (1 << 0)  # Turn on relay 1
-                logging.debug("Relay 1 activated for high to low.")
-            elif high_voltage_battery == 3 and low_voltage_battery == 1:
-                relay_state |= (1 << 0)  # Turn on relay 1
-                relay_state |= (1 << 1)  # Turn on relay 2
-                logging.debug("Relays 1 and 2 activated for high to low.")
-            elif high_voltage_battery == 1 and low_voltage_battery == 2:
-                relay_state |= (1 << 2)  # Turn on relay 3 for low to high
-                logging.debug("Relay 3 activated for low to high.")
-            elif high_voltage_battery == 1 and low_voltage_battery == 3:
-                relay_state |= (1 << 2)  # Turn on relay 3
-                relay_state |= (1 << 3)  # Turn on relay 4
-                logging.debug("Relays 3 and 4 activated for low to high.")
-            elif high_voltage_battery == 2 and low_voltage_battery == 3:
-                relay_state |= (1 << 0)  # Turn on relay 1
-                relay_state |= (1 << 2)  # Turn on relay 3
-                relay_state |= (1 << 3)  # Turn on relay 4
-                logging.debug("Relays 1, 3, and 4 activated for high to low.")
-            elif high_voltage_battery == 3 and low_voltage_battery == 2:
-                relay_state |= (1 << 0)  # Turn on relay 1
-                relay_state |= (1 << 1)  # Turn on relay 2
-                relay_state |= (1 << 2)  # Turn on relay 3
-                logging.debug("Relays 1, 2, and 3 activated for high to low.")
 
         logging.debug(f"Final relay state: {bin(relay_state)}")
         logging.info(f"Sending relay state command to hardware.")
-        bus.write_byte_data(config['I2C']['RelayAddress'], 0x11, relay_state)  # Changed from 0x10 to 0x11
+        with bus_lock:  # Wait for any voltage read in progress to finish
+            logging.debug("Switching to relay control channel.")
+            choose_channel(3)  # Select channel 3 for relay operations
+            bus.write_byte_data(config['I2C']['RelayAddress'], 0x11, relay_state)  # Changed from 0x10 to 0x11
         logging.info(f"Relay setup completed for balancing from Battery {high_voltage_battery} to Battery {low_voltage_battery}")
     except IOError as e:
         logging.error(f"I/O error while setting up relay: {e}")
@@ -288,10 +447,10 @@ def control_dcdc_converter(turn_on):
     try:
         GPIO.output(config['GPIO']['DC_DC_RelayPin'], GPIO.HIGH if turn_on else GPIO.LOW)
         logging.info(f"DC-DC Converter is now {'on' if turn_on else 'off'}")
-    except GPIO.GPIOError as e:
+    except (RuntimeError, ValueError) as e:  # What RPi.GPIO raises for an unset or invalid pin
         logging.error(f"Problem controlling DC-DC converter: {e}")
 
-def send_alert_email(voltage=None, battery_id=None, message_type="high"):
+def send_alert_email(voltage=None, battery_id=None, message_type="high", now=None):
     """
     Send an email when something goes wrong with battery voltage.
     
@@ -299,10 +458,13 @@ def send_alert_email(voltage=None, battery_id=None, message_type="high"):
         voltage (float or None): The voltage causing the alert.
         battery_id (int or None): Which battery caused the alert.
         message_type (str): Type of alert, either "high", "low", or "zero".
+        now (float or None): time.monotonic() taken by the caller; read here if not given.
     """
-    global last_email_time
+    global last_email_time, email_thread
     
-    if time.time() - last_email_time < config['General']['EmailAlertIntervalSeconds']:
+    if now is None:
+        now = time.monotonic()
+    if last_email_time is not None and now - last_email_time < config['General']['EmailAlertIntervalSeconds']:
         logging.debug("Skipping this alert email to avoid flooding.")
         return
 
@@ -318,63 +480,101 @@ def send_alert_email(voltage=None, battery_id=None, message_type="high"):
             content = f"Warning: Battery {battery_id} voltage is critically low! Current voltage: {voltage:.2f}V"
             subject = f"Battery Alert: Battery {battery_id} Low Voltage"
 
+        from email.mime.text import MIMEText  # Only needed once there is an alert, so not loaded at startup
         msg = MIMEText(content)
         msg['Subject'] = subject
         msg['From'] = config['Email']['SenderEmail']
         msg['To'] = config['Email']['RecipientEmail']
 
-        with smtplib.SMTP(config['Email']['SMTP_Server'], config['Email']['SMTP_Port']) as server:
-            server.send_message(msg)  
-        last_email_time = time.time()
-        logging.info(f"Alert email sent: {subject}")
+        # Hand the email to the background thread so the main loop never waits on the mail server
+        if email_thread is None or not email_thread.is_alive():
+            email_thread = threading.Thread(target=email_worker, daemon=True)
+            email_thread.start()
+        email_queue.put_nowait(msg)
+        last_email_time = now
+        logging.info(f"Alert email queued: {subject}")
     except Exception as e:
-        logging.error(f"Failed to send alert email: {e}")
+        logging.error(f"Failed to queue alert email: {e}")
 
-def check_for_voltage_issues(voltages):
+def email_worker():
+    """
+    Send queued alert emails in the background over one SMTP connection.
+    The connection is opened on first use, reopened once if the server dropped it,
+    and closed after SMTP_IDLE_SECONDS without mail.
+    """
+    global last_email_time
+    import smtplib  # Loaded with the first alert rather than at startup
+
+    server = None
+    while True:
+        try:
+            msg = email_queue.get(timeout=SMTP_IDLE_SECONDS if server else None)
+        except queue.Empty:
+            server.close()
+            server = None
+            logging.debug("Closed idle SMTP connection.")
+            continue
+        try:
+            for attempt in range(2):
+                if server is None:
+                    server = smtplib.SMTP(config['Email']['SMTP_Server'], config['Email']['SMTP_Port'], timeout=30)
+                try:
+                    server.send_message(msg)
+                    break
+                except smtplib.SMTPException:
+                    # Stale connection: drop it and try once more on a new one
+                    server.close()
+                    server = None
+                    if attempt == 1:
+                        raise
+            logging.info(f"Alert email sent: {msg['Subject']}")
+        except Exception as e:
+            last_email_time = None  # Let the next alert try again straight away
+            if server is not None:
+                server.close()
+                server = None
+            logging.error(f"Failed to send alert email: {e}")
+
+def check_for_voltage_issues(voltages, now=None):
     """
     Check if any battery voltage is too high, too low, or at a critical low level, set off alarms if necessary.
     
     Args:
         voltages (list): List of current voltages for each battery.
+        now (float or None): time.monotonic() for this check, shared by all alert emails it sends.
 
     Returns:
         bool: True if an alert was triggered, False otherwise.
     """
     alert_needed = False
+    if now is None:
+        now = time.monotonic()
     low_voltage_threshold = config['General']['LowVoltageThresholdPerBattery']
     high_voltage_threshold = config['General']['HighVoltageThresholdPerBattery']
 
     for i, voltage in enumerate(voltages, 1):  # Start from 1 for battery_id
         if voltage is None or voltage == 0.0:
             logging.warning(f"ALERT: Battery {i} voltage is {voltage}V, which is not right!")
-            try:
-                GPIO.output(config['GPIO']['AlarmRelayPin'], GPIO.HIGH)
-                send_alert_email(voltage, i, message_type="zero")
-                alert_needed = True
-            except Exception as e:
-                logging.error(f"Problem activating alarm for zero voltage: {e}")
+            message_type = "zero"
         elif voltage > high_voltage_threshold:
             logging.warning(f"ALERT: Battery {i} voltage is {voltage:.2f}V, too high!")
-            try:
-                GPIO.output(config['GPIO']['AlarmRelayPin'], GPIO.HIGH)
-                send_alert_email(voltage, i, message_type="high")
-                alert_needed = True
-            except Exception as e:
-                logging.error(f"Problem with high voltage alert: {e}")
+            message_type = "high"
         elif voltage <= low_voltage_threshold:
             logging.warning(f"LOW VOLTAGE ALERT: Battery {i} voltage is at {voltage:.2f}V, critically low!")
-            try:
-                GPIO.output(config['GPIO']['AlarmRelayPin'], GPIO.HIGH)
-                send_alert_email(voltage, i, message_type="low")
-                alert_needed = True
-            except Exception as e:
-                logging.error(f"Problem with low voltage alert: {e}")
-    
-    if not alert_needed:
+            message_type = "low"
+        else:
+            continue
+        alert_needed = True
         try:
-            GPIO.output(config['GPIO']['AlarmRelayPin'], GPIO.LOW)
+            send_alert_email(voltage, i, message_type=message_type, now=now)
         except Exception as e:
-            logging.error(f"Problem turning off alarm: {e}")
+            logging.error(f"Problem sending {message_type} voltage alert: {e}")
+
+    # Set the alarm once for the whole check instead of once per battery in trouble
+    try:
+        GPIO.output(config['GPIO']['AlarmRelayPin'], GPIO.HIGH if alert_needed else GPIO.LOW)
+    except Exception as e:
+        logging.error(f"Problem {'activating' if alert_needed else 'turning off'} alarm: {e}")
     
     return alert_needed
 
@@ -393,9 +593,9 @@ def balance_battery_voltages(stdscr, high_voltage_battery, low_voltage_battery):
 
         logging.info(f"Starting balance from Battery {high_voltage_battery} to {low_voltage_battery}")
 
-        # Initial voltage reading
-        voltage_high, _, _ = read_voltage_with_retry(high_voltage_battery)
-        voltage_low, _, _ = read_voltage_with_retry(low_voltage_battery)
+        # Initial voltage reading (newest values from the poller thread)
+        voltage_high, _, _ = get_latest_reading(high_voltage_battery)
+        voltage_low, _, _ = get_latest_reading(low_voltage_battery)
         
         if voltage_low == 0.0:
             logging.warning(f"Cannot balance to Battery {low_voltage_battery} as it shows 0.00V. Skipping balancing.")
@@ -419,20 +619,29 @@ def balance_battery_voltages(stdscr, high_voltage_battery, low_voltage_battery):
         control_dcdc_converter(True)
 
         logging.info("Starting balancing process.")
-        while time.time() - balance_start_time < config['General']['BalanceDurationSeconds']:
-            elapsed_time = time.time() - balance_start_time
-            progress = min(1.0, elapsed_time / config['General']['BalanceDurationSeconds'])
+        balance_duration = config['General']['BalanceDurationSeconds']
+        balance_end_time = balance_start_time + balance_duration  # Work out the finish time once
+        bar_length = 20
+        # Redraw when the progress bar moves a step rather than on a fixed 0.1s tick
+        # (at least 0.1s apart, and at most 1s so the spinner keeps moving on long balances)
+        redraw_interval = min(max(balance_duration / bar_length, 0.1), 1.0)
+        while running:
+            now = time.time()
+            if now >= balance_end_time:
+                break
+            progress = min(1.0, (now - balance_start_time) / balance_duration)
             
-            # Re-read voltages during balancing
-            voltage_high, _, _ = read_voltage_with_retry(high_voltage_battery)
-            voltage_low, _, _ = read_voltage_with_retry(low_voltage_battery)
+            # Pick up the poller thread's latest voltages during balancing
+            voltage_high, _, _ = get_latest_reading(high_voltage_battery)
+            voltage_low, _, _ = get_latest_reading(low_voltage_battery)
             
             # Update the global list of battery voltages
-            battery_voltages[high_voltage_battery - 1] = voltage_high if voltage_high is not None else 0.0
-            battery_voltages[low_voltage_battery - 1] = voltage_low if voltage_low is not None else 0.0
+            voltage_high = voltage_high if voltage_high is not None else 0.0
+            voltage_low = voltage_low if voltage_low is not None else 0.0
+            battery_voltages[high_voltage_battery - 1] = voltage_high
+            battery_voltages[low_voltage_battery - 1] = voltage_low
 
             # Make a simple progress bar for the screen
-            bar_length = 20
             filled_length = int(bar_length * progress)
             bar = '=' * filled_length + ' ' * (bar_length - filled_length)
             
@@ -440,10 +649,11 @@ def balance_battery_voltages(stdscr, high_voltage_battery, low_voltage_battery):
             stdscr.addstr(11, 0, f"Progress: [{bar}] {int(progress * 100)}%", curses.color_pair(6))  # BALANCE_COLOR
             stdscr.refresh()  # Update the screen with new voltage readings
             
-            logging.debug(f"Balancing progress: {progress * 100:.2f}%, High Voltage: {voltage_high:.2f}V, Low Voltage: {voltage_low:.2f}V")
+            # %-style so the message is only built when debug logging is on
+            logging.debug("Balancing progress: %.2f%%, High Voltage: %.2fV, Low Voltage: %.2fV", progress * 100, voltage_high, voltage_low)
             
             frame_index += 1
-            time.sleep(0.01)  # Small delay to not update too frequently
+            time.sleep(min(redraw_interval, balance_end_time - now))  # Wake for the next redraw, or exactly when balancing ends
 
         logging.info("Balancing process completed.")
         logging.info("Turning off DC-DC converter.")
@@ -468,6 +678,21 @@ def balance_battery_voltages(stdscr, high_voltage_battery, low_voltage_battery):
 
 
 
+def handle_shutdown_signal(sig, frame):
+    """
+    Ask the program to stop after a Ctrl+C (SIGINT) or SIGTERM.
+
+    Only clears the running flag, so a signal never interrupts an I2C transfer half way;
+    the loops notice the flag and exit, and the relays and DC-DC converter are switched off on the way out.
+
+    Args:
+        sig (int): The signal number.
+        frame (frame object): Current stack frame (unused).
+    """
+    global running
+    logging.info(f"Received signal {sig}, shutting down")
+    running = False
+
 def main_program(stdscr):
     global battery_voltages, balance_start_time, balancing_active, last_balance_time
 
@@ -517,22 +742,45 @@ def main_program(stdscr):
 
         balancing_active = False  # Flag to indicate if balancing is active
         last_balance_time = 0  # New global variable for balancing timer
-
-        while True:
+        total_voltage_art = ('', [])  # Last total voltage text and its Roman-font lines
+
+        # Don't draw (or raise zero-voltage alarms) until every battery has a real reading
+        stdscr.addstr(0, 0, "Reading battery voltages...", INFO_COLOR)
+        stdscr.refresh()
+        first_poll_done.wait()
+
+        # Settings and functions used every frame, bound to locals once instead of looked up each pass
+        num_batteries = config['General']['NumberOfBatteries']
+        high_threshold = config['General']['HighVoltageThresholdPerBattery']
+        low_threshold = config['General']['LowVoltageThresholdPerBattery']
+        total_voltage_high = high_threshold * num_batteries
+        total_voltage_low = low_threshold * num_batteries
+        voltage_difference = config['General']['VoltageDifferenceToBalance']
+        rest_period = config['General']['BalanceRestPeriodSeconds']
+        sleep_time = config['General']['SleepTimeBetweenChecks']
+        get_time = time.time
+        get_monotonic = time.monotonic
+        sleep = time.sleep
+        read_latest = get_latest_reading
+        check_issues = check_for_voltage_issues
+        addstr = stdscr.addstr
+        # The loop never reads keys, so curses.COLS can't change while it runs; work out the rule width once
+        rule_width = curses.COLS - 1
+        y_offset = 0  # Set before the first frame so the error handler below always has a row to write to
+
+        while running:
             try:
-                stdscr.clear()
-                battery_voltages = []
-                for i in range(1, config['General']['NumberOfBatteries'] + 1):
-                    voltage, _, _ = read_voltage_with_retry(i, number_of_samples=2, max_attempts=2)
-                    battery_voltages.append(voltage if voltage is not None else 0.0)
+                # erase() only blanks the buffer; unlike clear() it doesn't force a full repaint,
+                # so refresh() sends just the characters that changed since the last frame
+                stdscr.erase()
+                # Newest readings from the poller thread; the screen never waits on the I2C bus
+                latest = [read_latest(i) for i in range(1, num_batteries + 1)]
+                battery_voltages = [voltage if voltage is not None else 0.0 for voltage, _, _ in latest]
                 
                 # Total voltage of all batteries
                 total_voltage = sum(battery_voltages)
                 
                 # Determine color based on total battery voltage
-                total_voltage_high = config['General']['HighVoltageThresholdPerBattery'] * config['General']['NumberOfBatteries']
-                total_voltage_low = config['General']['LowVoltageThresholdPerBattery'] * config['General']['NumberOfBatteries']
-                
                 if total_voltage > total_voltage_high:
                     color = HIGH_VOLTAGE_COLOR
                 elif total_voltage < total_voltage_low:
@@ -541,101 +789,113 @@ def main_program(stdscr):
                     color = OK_VOLTAGE_COLOR
 
                 # Use the art library to display the total voltage in Roman font
-                roman_voltage = text2art(f"{total_voltage:.2f}V", font='roman', chr_ignore=True)
+                # (rendering is slow, so only redo it when the displayed value changes)
+                total_voltage_str = f"{total_voltage:.2f}V"
+                if total_voltage_str != total_voltage_art[0]:
+                    total_voltage_art = (total_voltage_str, text2art(total_voltage_str, font='roman', chr_ignore=True).splitlines())
+                roman_lines = total_voltage_art[1]
                 
-                stdscr.addstr(0, 0, "Battery Balancer GUI", TITLE_COLOR)
-                for i, line in enumerate(roman_voltage.splitlines()):
-                    stdscr.addstr(i + 1, 0, line, color)
-                stdscr.hline(len(roman_voltage.splitlines()) + 1, 0, curses.ACS_HLINE, curses.COLS - 1)
+                addstr(0, 0, "Battery Balancer GUI", TITLE_COLOR)
+                for i, line in enumerate(roman_lines):
+                    addstr(i + 1, 0, line, color)
+                stdscr.hline(len(roman_lines) + 1, 0, curses.ACS_HLINE, rule_width)
                 
-                y_offset = len(roman_voltage.splitlines()) + 2
+                y_offset = len(roman_lines) + 2
+                # Work out each battery's color and label once per frame, not once per art row
+                battery_colors = []
+                for volt in battery_voltages:
+                    if volt == 0.0:
+                        battery_colors.append(ERROR_COLOR)
+                    elif volt > high_threshold:
+                        battery_colors.append(HIGH_VOLTAGE_COLOR)
+                    elif volt < low_threshold:
+                        battery_colors.append(LOW_VOLTAGE_COLOR)
+                    else:
+                        battery_colors.append(OK_VOLTAGE_COLOR)
+
+                # Neighbouring batteries in the same color are drawn as one piece of each row
+                # (usually all of them are OK, so each row is a single addstr)
+                color_runs = []  # [start_pos, end_pos, color]
+                for j, color in enumerate(battery_colors):
+                    if color_runs and color_runs[-1][2] == color:
+                        color_runs[-1][1] = (j + 1) * 17
+                    else:
+                        color_runs.append([j * 17, (j + 1) * 17, color])
+
                 for i, line in enumerate(battery_art):
-                    for j, volt in enumerate(battery_voltages):
-                        if volt == 0.0:
-                            color = ERROR_COLOR
-                        elif volt > config['General']['HighVoltageThresholdPerBattery']:
-                            color = HIGH_VOLTAGE_COLOR
-                        elif volt < config['General']['LowVoltageThresholdPerBattery']:
-                            color = LOW_VOLTAGE_COLOR
-                        else:
-                            color = OK_VOLTAGE_COLOR
-                        
-                        start_pos = j * 17
-                        end_pos = start_pos + 17
-                        stdscr.addstr(i + y_offset, start_pos, line[start_pos:end_pos], color)
-
-                    for j, volt in enumerate(battery_voltages):
-                        if volt == 0.0:
-                            voltage_str = "0.00V"
-                            color = ERROR_COLOR
-                        else:
-                            voltage_str = f"{volt:.2f}V"
-                            if volt > config['General']['HighVoltageThresholdPerBattery']:
-                                color = HIGH_VOLTAGE_COLOR
-                            elif volt < config['General']['LowVoltageThresholdPerBattery']:
-                                color = LOW_VOLTAGE_COLOR
-                            else:
-                                color = OK_VOLTAGE_COLOR
-                        
-                        if j == 1:  # Second cell (0-indexed)
-                            center_pos = 17 * j + 3 - 3  # Move 3 spaces to the left
-                        elif j == 2:  # Third cell (0-indexed)
-                            center_pos = 17 * j + 3 - 6  # Move 6 spaces to the left
-                        else:
-                            center_pos = 17 * j + 3  # Default position for the first cell
-                        
-                        stdscr.addstr(y_offset + 6, center_pos, voltage_str.center(11), color)
+                    for start_pos, end_pos, color in color_runs:
+                        addstr(i + y_offset, start_pos, line[start_pos:end_pos], color)
+
+                # Voltage labels on top of the art (drawn once, after all art rows)
+                for j, (volt, color) in enumerate(zip(battery_voltages, battery_colors)):
+                    voltage_str = "0.00V" if volt == 0.0 else f"{volt:.2f}V"
+                    
+                    if j == 1:  # Second cell (0-indexed)
+                        center_pos = 17 * j + 3 - 3  # Move 3 spaces to the left
+                    elif j == 2:  # Third cell (0-indexed)
+                        center_pos = 17 * j + 3 - 6  # Move 6 spaces to the left
+                    else:
+                        center_pos = 17 * j + 3  # Default position for the first cell
+                    
+                    addstr(y_offset + 6, center_pos, voltage_str.center(11), color)
 
                 y_offset += len(battery_art)  # Move cursor down after drawing
-                for i in range(1, config['General']['NumberOfBatteries'] + 1):
-                    voltage, readings, adc_values = read_voltage_with_retry(i, number_of_samples=2, max_attempts=2)
-                    logging.debug(f"Battery {i} - Voltage: {voltage}, ADC: {adc_values}, Readings: {readings}")
+                for i in range(1, num_batteries + 1):
+                    voltage, readings, adc_values = latest[i - 1]
+                    # %-style so the lists are only formatted when debug logging is on
+                    logging.debug("Battery %s - Voltage: %s, ADC: %s, Readings: %s", i, voltage, adc_values, readings)
                     if voltage is None:
                         voltage = 0.0
-                    stdscr.addstr(y_offset + i - 1, 0, f"Battery {i}: (ADC: {adc_values[0] if adc_values else 'N/A'})", ADC_READINGS_COLOR)
+                    addstr(y_offset + i - 1, 0, f"Battery {i}: (ADC: {adc_values[0] if adc_values else 'N/A'})", ADC_READINGS_COLOR)
                     
                     if readings:
-                        stdscr.addstr(y_offset + i, 0, f"[Readings: {', '.join(f'{v:.2f}' for v in readings)}]", ADC_READINGS_COLOR)
+                        addstr(y_offset + i, 0, f"[Readings: {', '.join(f'{v:.2f}' for v in readings)}]", ADC_READINGS_COLOR)
                     else:
-                        stdscr.addstr(y_offset + i, 0, "  [Readings: No data]", ADC_READINGS_COLOR)
+                        addstr(y_offset + i, 0, "  [Readings: No data]", ADC_READINGS_COLOR)
                     y_offset += 1  # Increment y_offset for each battery's readings line
 
-                if len(battery_voltages) == config['General']['NumberOfBatteries']:
-                    max_voltage = max(battery_voltages)
-                    min_voltage = min(battery_voltages)
-                    high_battery = battery_voltages.index(max_voltage) + 1  # +1 for 1-indexed
-                    low_battery = battery_voltages.index(min_voltage) + 1  # +1 for 1-indexed
+                if len(battery_voltages) == num_batteries:
+                    # One pass for both the highest and lowest battery
+                    high_index = low_index = 0
+                    max_voltage = min_voltage = battery_voltages[0]
+                    for index, volt in enumerate(battery_voltages):
+                        if volt > max_voltage:
+                            max_voltage, high_index = volt, index
+                        elif volt < min_voltage:
+                            min_voltage, low_index = volt, index
+                    high_battery = high_index + 1  # +1 for 1-indexed
+                    low_battery = low_index + 1  # +1 for 1-indexed
 
                     # Check if balancing should be deferred
-                    current_time = time.time()
-                    if max_voltage - min_voltage > config['General']['VoltageDifferenceToBalance'] and min_voltage > 0:
-                        if current_time - last_balance_time > config['General']['BalanceRestPeriodSeconds']:
+                    current_time = get_time()
+                    if max_voltage - min_voltage > voltage_difference and min_voltage > 0:
+                        if current_time - last_balance_time > rest_period:
                             balancing_active = True
                             balance_battery_voltages(stdscr, high_battery, low_battery)
                             balancing_active = False
                         else:
                             # Inform user that balancing is deferred
-                            stdscr.addstr(y_offset + config['General']['NumberOfBatteries'] + 2, 0, "  [ WAIT ]", INFO_COLOR)
-                            stdscr.addstr(y_offset + config['General']['NumberOfBatteries'] + 3, 0, f"Balancing deferred for {int(config['General']['BalanceRestPeriodSeconds'] - (current_time - last_balance_time))} more seconds.", INFO_COLOR)
+                            addstr(y_offset + num_batteries + 2, 0, "  [ WAIT ]", INFO_COLOR)
+                            addstr(y_offset + num_batteries + 3, 0, f"Balancing deferred for {int(rest_period - (current_time - last_balance_time))} more seconds.", INFO_COLOR)
                     else:
-                        stdscr.addstr(y_offset + config['General']['NumberOfBatteries'] + 2, 0, "  [ OK ]", OK_VOLTAGE_COLOR)
+                        addstr(y_offset + num_batteries + 2, 0, "  [ OK ]", OK_VOLTAGE_COLOR)
                         if min_voltage == 0:
-                            stdscr.addstr(y_offset + config['General']['NumberOfBatteries'] + 3, 0, "No balancing possible due to zero voltage battery.", ERROR_COLOR)
+                            addstr(y_offset + num_batteries + 3, 0, "No balancing possible due to zero voltage battery.", ERROR_COLOR)
                         else:
-                            stdscr.addstr(y_offset + config['General']['NumberOfBatteries'] + 3, 0, "No need to balance, voltages are good.", INFO_COLOR)
+                            addstr(y_offset + num_batteries + 3, 0, "No need to balance, voltages are good.", INFO_COLOR)
 
                 # Check if we need to sound any alarms
-                check_for_voltage_issues(battery_voltages)
+                check_issues(battery_voltages, get_monotonic())
 
                 stdscr.refresh()
                 
-                time.sleep(config['General']['SleepTimeBetweenChecks'])
+                sleep(sleep_time)
 
             except Exception as e:
                 logging.error(f"Something went wrong in the main loop: {e}")
-                stdscr.addstr(y_offset + config['General']['NumberOfBatteries'] + 5, 0, f"Error: {e}", ERROR_COLOR)
+                addstr(y_offset + num_batteries + 5, 0, f"Error: {e}", ERROR_COLOR)
                 stdscr.refresh()  # Refresh to show the error
-                time.sleep(0.1)  # Keep this brief
+                sleep(0.1)  # Keep this brief
 
     except Exception as e:
         logging.critical(f"A serious error in the main loop: {e}")
@@ -644,11 +904,17 @@ def main_program(stdscr):
 if __name__ == '__main__':
     try:
         logging.info("Starting the Battery Balancer program")
+        signal.signal(signal.SIGINT, handle_shutdown_signal)
+        signal.signal(signal.SIGTERM, handle_shutdown_signal)
         setup_hardware()
         curses.wrapper(main_program)  # Use curses to manage screen setup and cleanup
     except Exception as e:
         logging.critical(f"Something unexpected happened while running the script: {e}")
         sys.exit(1)
     finally:
+        if bus is not None:
+            # Leave the hardware in a safe state: converter off, all relays open
+            control_dcdc_converter(False)
+            set_relay_connection(0, 0)
         GPIO.cleanup()  # Make sure to clean up GPIO even if something goes wrong
         logging.info("Program finished. Cleaned up GPIO.")
\ No newline at end of file
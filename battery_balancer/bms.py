@@ -195,12 +195,12 @@ v |
 # 2. **Install Hardware Libraries:** sudo apt install python3-smbus python3-rpi.gpio.
 # 3. **Install Art Library:** pip install art (or sudo pip install art if needed).
 # 4. **Install RRDTool for Time-Series:** sudo apt install rrdtool.
-# 5. **Enable I2C:** Run sudo raspi-config, go to Interface Options > I2C > Enable, then reboot.
+# 5. **Enable I2C:** Run sudo raspi-config, go to Interface Options > I2C > Enable. For faster sensor reads, add dtparam=i2c_arm_baudrate=400000 to /boot/config.txt (400 kHz instead of 100 kHz). Then reboot.
 # 6. **Create/Edit INI File:** Make 'battery_monitor.ini' in same folder as script. Copy template below and fill in values (e.g., emails, IPs, slave addresses).
 # 7. **Run Script:** sudo python bms.py (needs root for hardware access).
 # **Validate Config:** python bms.py --validate-config [--data-dir /path/to/config]
 # 8. **View Web Dashboard:** Open browser to http://<your-pi-ip>:8080. Charts will load via Chart.js CDN.
-# 9. **Logs:** Check 'battery_monitor.log' for details. Set LoggingLevel=DEBUG in INI for more info.
+# 9. **Logs:** Check 'battery_monitor.log' for details (rotated at 5 MB, 3 old files kept; routine lines are written in batches, warnings at once). Set LoggingLevel=DEBUG in INI for more info.
 # 10. **RRD Database:** Created automatically as 'bms.rrd' on first run. No manual setup needed.
 # **Notes & Troubleshooting:**
 # - **Hardware Matching:** Ensure INI addresses/pins match your setup. Wrong IP/port/slave = no temps.
@@ -225,12 +225,15 @@ import statistics # Math helper for calculating averages and middle values of te
 import time # Time management - handles delays, waits, and records when things happen (like a clock).
 import configparser # Settings reader - loads configuration from the INI file, like reading a recipe book.
 import logging # Event recorder - writes messages about what's happening to a log file for later review.
+import logging.handlers # Log file helpers - rotates the log file and batches writes to the SD card.
 import signal # Shutdown handler - catches when user presses Ctrl+C to stop the program nicely.
 import gc # Memory cleaner - removes unused data from memory to keep the program running smoothly.
 import os # File system manager - handles reading/writing files, like saving calibration data.
 import sys # System controller - manages program exit and command-line arguments.
 import argparse # Command-line argument parser - handles options like --validate-config.
 import threading # Multi-tasking tool - runs the web server separately from the main program.
+import select # Input waiter - sleeps until the next poll but wakes instantly on a key press.
+import queue # Waiting line - hands alert emails to a background sender so the main loop never waits on the mail server.
 import json # Data formatter - converts data to/from a format that web browsers understand.
 from urllib.parse import urlparse, parse_qs # Web request parser - breaks down web addresses and data.
 import base64 # Secret code decoder - handles user login credentials for the web interface.
@@ -250,6 +253,7 @@ except ImportError:
     smbus = None # Set to none if missing.
     GPIO = None # Set to none if missing.
 from email.mime.text import MIMEText # Builds email messages - email builder.
+from email.utils import formatdate # Date header for alert emails - postmark.
 import smtplib # Sends email alerts - email sender.
 import curses # Creates the terminal-based Text User Interface (TUI) - terminal drawer.
 from art import text2art # Generates ASCII art for the TUI display - art maker.
@@ -294,6 +298,17 @@ alive_timestamp = 0.0 # Shared timestamp updated by main to indicate aliveness -
 RRD_FILE = 'bms.rrd' # RRD database file for storing time-series data - persistent storage.
 HISTORY_LIMIT = 1440 # Number of historical entries to retain (e.g., ~24 hours at 1min steps) - limit for memory/efficiency.
 data_lock = threading.Lock() # Lock for thread-safe access to web_data
+email_queue = queue.Queue() # Alert emails waiting to be sent by the background email thread - outbox.
+email_thread = None # Background thread that sends queued alert emails - mail carrier.
+COLOR_PAIRS = [] # Curses color attributes by pair number, filled once in main() - paint palette.
+SMTP_IDLE_SECONDS = 60 # Close the reused SMTP connection after this long without mail - mail carrier's break.
+current_channel = None # Last I2C multiplexer channel selected (None = unknown) - skips repeat switching.
+configured_meters = set() # Multiplexer channels whose ADC config register is already written - skips repeat setup.
+last_relay_pair = None # (high, low) the relays were last set to, (0, 0) = all off, None = unknown - skips repeat relay writes.
+local_ip_address = None # LAN address shown in the TUI, re-looked up every IP_REFRESH_SECONDS - saves a socket per frame.
+local_ip_checked = None # time.monotonic() of the last IP lookup (None = not looked up yet).
+IP_REFRESH_SECONDS = 300 # Look the IP up again after this long, so a DHCP renewal or network change shows up - address book check.
+total_voltage_art = ('', []) # Last total-voltage text and its ASCII art lines - re-rendered only when the text changes.
 
 def check_dependencies():
     """
@@ -545,8 +560,8 @@ def read_ntc_sensors(ip, modbus_port, query_delay, num_channels, scaling_factor,
         except socket.error as e:
             # Log warning for this attempt.
             logging.warning(f"Temp read attempt {attempt+1} for slave {slave_addr} failed: {str(e)}. Checking network connectivity.")
-            # Sleep 3 seconds for network recovery.
-            time.sleep(3)
+            # Short pause for network recovery, doubling per attempt but capped at 0.5 s (was a fixed 3 s).
+            time.sleep(min(0.05 * 2 ** attempt, 0.5))
             # Test network connectivity.
             if test_modbus_connectivity(ip, modbus_port):
                 # Network is up, so it's a legitimate device error—use original retry logic.
@@ -568,8 +583,8 @@ def read_ntc_sensors(ip, modbus_port, query_delay, num_channels, scaling_factor,
         # Handle validation errors (e.g., bad response format).
         except ValueError as e:
             logging.warning(f"Temp read attempt {attempt+1} for slave {slave_addr} failed (validation): {str(e)}. Checking network connectivity.")
-            # Sleep 3 seconds for network recovery.
-            time.sleep(3)
+            # Short pause for network recovery, doubling per attempt but capped at 0.5 s (was a fixed 3 s).
+            time.sleep(min(0.05 * 2 ** attempt, 0.5))
             # Test network connectivity.
             if test_modbus_connectivity(ip, modbus_port):
                 # Network is up, so it's a legitimate device error—use original retry logic.
@@ -656,6 +671,8 @@ def load_config(data_dir):
     # Voltage and general settings from [General] section.
     voltage_settings = {
         'VoltageDifferenceToBalance': config_parser.getfloat('General', 'VoltageDifferenceToBalance', fallback=0.1),  # Min diff to trigger balance V.
+        'BalanceHysteresis': config_parser.getfloat('General', 'BalanceHysteresis', fallback=0.0),  # Extra diff needed to re-balance right after a balance V.
+        'VoltageFilterAlpha': config_parser.getfloat('General', 'VoltageFilterAlpha', fallback=0.5),  # Smoothing weight of newest reading for balance decisions (1.0 = off).
         'BalanceDurationSeconds': config_parser.getint('General', 'BalanceDurationSeconds', fallback=5),  # How long to balance s.
         'SleepTimeBetweenChecks': config_parser.getfloat('General', 'SleepTimeBetweenChecks', fallback=0.1),  # Delay between voltage reads.
         'BalanceRestPeriodSeconds': config_parser.getint('General', 'BalanceRestPeriodSeconds', fallback=60),  # Cooldown after balance s.
@@ -706,6 +723,9 @@ def load_config(data_dir):
     for i in range(1, temp_settings['num_series_banks'] + 1):
         key = f'Sensor{i}_Calibration'
         calibration_settings[key] = config_parser.getfloat('Calibration', key, fallback=1.0)
+    # Volts per ADC count for each bank, worked out once: full scale 6.144V / 32767, through the divider, times calibration.
+    bank_volts_per_count = tuple((6.144 / 32767) / voltage_settings['VoltageDividerRatio'] * calibration_settings[f'Sensor{i}_Calibration']
+                                 for i in range(1, temp_settings['num_series_banks'] + 1))
     # Startup test parameters.
     startup_settings = {
         'test_balance_duration': config_parser.getint('Startup', 'test_balance_duration', fallback=15),  # Test balance time s.
@@ -744,9 +764,26 @@ def load_config(data_dir):
     relay_pins = {
         f'Relay{i}_Pin': config_parser.getint('GPIO', f'Relay{i}_Pin', fallback=[17,18,27,22][i]) for i in range(4)
     }
+    # Lookup table built once: (high, low) bank pair -> GPIO pins to switch on, so balancing needs no parsing per call.
+    relay_all_pins = tuple(relay_pins[f'Relay{i}_Pin'] for i in range(4))
+    relay_pin_table = {}
+    for key, relays in relay_mapping.items():
+        try:
+            high, low = (int(x) for x in key.split('-'))
+        except ValueError:
+            logging.warning(f"Invalid relay mapping key {key} (expected e.g. 1-2).")  # Log bad key.
+            continue
+        if high == low or not (1 <= high <= temp_settings['num_series_banks'] and 1 <= low <= temp_settings['num_series_banks']):
+            continue  # Pair can't be balanced with this bank count; leave it out so lookups reject it.
+        for relay in relays:
+            if not 0 <= relay < 4:  # Validate relay index
+                logging.warning(f"Invalid relay index {relay} for {key}")
+        relay_pin_table[(high, low)] = tuple(relay_all_pins[relay] for relay in relays if 0 <= relay < 4)
     return {**temp_settings, **voltage_settings, **general_flags, **i2c_settings,
             **gpio_settings, **email_settings, **adc_settings, **calibration_settings,
-            **startup_settings, **web_settings, 'relay_mapping': relay_mapping, **relay_pins}
+            **startup_settings, **web_settings, 'relay_mapping': relay_mapping, **relay_pins,
+            'relay_all_pins': relay_all_pins, 'relay_pin_table': relay_pin_table,
+            'bank_volts_per_count': bank_volts_per_count, 'ADCConversionDelay': adc_conversion_delay(adc_settings)}
 
 def validate_config(settings):
     """
@@ -786,6 +823,12 @@ def validate_config(settings):
     if len(settings['modbus_slave_addresses']) != settings['number_of_parallel_batteries']:
         errors.append("modbus_slave_addresses count must match number_of_parallel_batteries.")
    
+    # Voltage smoothing weight must be in (0, 1]; hysteresis can't be negative.
+    if not 0 < settings['VoltageFilterAlpha'] <= 1:
+        errors.append("VoltageFilterAlpha must be greater than 0 and at most 1.")
+    if settings['BalanceHysteresis'] < 0:
+        errors.append("BalanceHysteresis must not be negative.")
+   
     # For relay mapping, ensure every possible pair (high-low) has a mapping.
     if settings.get('relay_mapping'):
         expected_pairs = []
@@ -826,7 +869,7 @@ def detect_hardware(settings):
     if bus:
         try:
             # Select channel 0 on multiplexer (default) and read from it.
-            choose_channel(0, settings['MultiplexerAddress'])
+            choose_channel(0, settings['MultiplexerAddress'], force=True)
             logging.info("I2C multiplexer detected.")  # Success.
         except IOError as e:
             logging.warning(f"I2C multiplexer not accessible: {e}")  # Failure log.
@@ -1293,41 +1336,84 @@ def check_sudden_disconnection(current, previous_temps, ch, alerts, settings):
             event_log.pop(0)
         logging.warning(f"Sudden disconnection alert on Battery {bat_id} Bank {bank} Local Ch {local_ch}.")
 
-def choose_channel(channel, multiplexer_address):
+def choose_channel(channel, multiplexer_address, force=False):
     """
     Switch to a specific I2C channel using the TCA9548A multiplexer.
     The multiplexer allows accessing multiple I2C devices on different channels (like a switchboard).
     Writes a byte to the mux address with bit set for the channel (e.g., channel 0 = 0x01).
+    Skips the write if that channel is already selected; an I2C error forgets the cached channel.
     Non-programmer: Like selecting which outlet to plug into on a power strip with switches.
     
     Args:
         channel (int): Channel number (0-7 typically).
         multiplexer_address (int): I2C address of the mux (e.g., 0x70).
+        force (bool): Write even if the channel is already selected (used for hardware checks).
     
     Returns:
-        None
+        bool: True if the channel is selected (or there is no bus in test mode), False if the switch failed.
     """
+    # Global: Cached selection.
+    global current_channel
+    # Already on this channel—nothing to do.
+    if channel == current_channel and not force:
+        return True
     # Log for debug.
-    logging.debug(f"Switching to I2C channel {channel}.")
+    logging.debug("Switching to I2C channel %d.", channel)
     if bus:
         try:
             # Write byte: 1 shifted left by channel number (bitmask).
             bus.write_byte(multiplexer_address, 1 << channel)
+            current_channel = channel
         except IOError as e:
-            logging.error(f"I2C error selecting channel {channel}: {str(e)}")
+            # State unknown after an error—force a write next time.
+            current_channel = None
+            logging.error("I2C error selecting channel %d: %s", channel, e)
+            return False
+    return True
+
+# ADS1115 data rates in samples per second, indexed by the DR bits (7:5) of the config register.
+ADS1115_DATA_RATES = (8, 16, 32, 64, 128, 250, 475, 860)
+
+def adc_conversion_delay(settings):
+    """
+    Work out how long one ADS1115 conversion takes at the configured sample rate.
+    setup_voltage_meter writes the config word with write_word_data, which sends the low byte first, so the chip
+    sees the two bytes swapped; the DR bits (7:5) are taken from the register as the chip holds it
+    (e.g., the default 0x0580 lands as 0x8005 -> 8 SPS -> 125 ms) plus a small margin.
+    The meters run in continuous mode, where the OS bit does not flag a finished conversion, so this wait
+    is the shortest one that still guarantees a fresh sample.
+    Non-programmer: Like knowing how long the voltmeter needs to settle before you read the display.
+    
+    Args:
+        settings (dict): ADC config values.
+    
+    Returns:
+        float: Seconds to wait after (re)configuring the ADC before reading.
+    """
+    # Config word as written, then as the chip stores it (bytes swapped on the wire).
+    config_value = settings['ContinuousModeConfig'] | settings['SampleRateConfig'] | settings['GainConfig']
+    register_value = (config_value & 0xFF) << 8 | (config_value >> 8)
+    # Look up samples per second from the rate bits.
+    data_rate = ADS1115_DATA_RATES[(register_value >> 5) & 0x07]
+    # One conversion period plus 1 ms margin.
+    return 1.0 / data_rate + 0.001
 
 def setup_voltage_meter(settings):
     """
     Configure the ADS1115 ADC for voltage measurement.
-    Sets continuous mode, sample rate, and gain via config register.
+    Sets continuous mode, sample rate, and gain via config register. The meter keeps converting with these
+    settings, so each channel's meter is only written once; an I2C error makes the next call write again.
     Non-programmer: Like setting dials on a voltmeter for accurate reading (range, speed).
     
     Args:
         settings (dict): ADC config values.
     
     Returns:
-        None
+        bool: True if the meter is configured (or there is no bus in test mode), False if the write failed.
     """
+    # Meter on the selected channel is already set up—nothing to do.
+    if current_channel in configured_meters:
+        return True
     # Log.
     logging.debug("Configuring voltage meter ADC.")
     if bus:
@@ -1338,8 +1424,62 @@ def setup_voltage_meter(settings):
                             settings['GainConfig'])
             # Write to config register.
             bus.write_word_data(settings['VoltageMeterAddress'], settings['ConfigRegister'], config_value)
+            # Remember it (only if the channel is known).
+            if current_channel is not None:
+                configured_meters.add(current_channel)
         except IOError as e:
-            logging.error(f"I2C error configuring voltage meter: {str(e)}")
+            # State unknown after an error—configure again next time.
+            configured_meters.discard(current_channel)
+            logging.error("I2C error configuring voltage meter: %s", e)
+            return False
+    return True
+
+def read_adc_word(settings, register):
+    """
+    Read one 16-bit ADS1115 register from the meter on the selected channel.
+    read_word_data sets the register pointer and reads in one combined transaction (repeated start), so no
+    separate pointer write or STOP is needed. The ADC sends the high byte first; SMBus words are low byte first,
+    so the bytes are swapped. Raises IOError on bus errors. Non-programmer: Like asking a question and hearing
+    the answer in the same phone call.
+    
+    Args:
+        settings (dict): ADC address config.
+        register (int): Register to read (e.g., ConversionRegister).
+    
+    Returns:
+        int: Register value (0-65535).
+    """
+    # Combined write-pointer/read transaction.
+    value = bus.read_word_data(settings['VoltageMeterAddress'], register)
+    # Swap bytes (big-endian from the ADC).
+    return (value & 0xFF) << 8 | (value >> 8)
+
+def average_valid_readings(readings, raw_values):
+    """
+    Average a set of voltage samples, keeping only those within 5% of the overall average.
+    Shared by the single-bank and all-bank read paths. Non-programmer: Like throwing out a multimeter
+    reading that is clearly off before averaging the rest.
+    
+    Args:
+        readings (list): Converted voltages (0.0 for failed samples).
+        raw_values (list): Matching raw ADC values.
+    
+    Returns:
+        tuple: (average_voltage float or None, list of valid readings, list of valid raw ADC)
+    """
+    # Nothing to average.
+    if not readings:
+        return None, [], []
+    average = sum(readings) / len(readings)
+    # Filter valid: Within 5% of average.
+    tolerance = 0.05 * (average if average != 0 else 1)
+    valid_pairs = [(r, adc) for r, adc in zip(readings, raw_values) if abs(r - average) <= tolerance]
+    if not valid_pairs:
+        return None, [], []
+    valid_readings = [r for r, _ in valid_pairs]
+    valid_adc = [adc for _, adc in valid_pairs]
+    # Average of the valid samples.
+    return sum(valid_readings) / len(valid_readings), valid_readings, valid_adc
 
 def read_voltage_with_retry(bank_id, settings):
     """
@@ -1358,136 +1498,214 @@ def read_voltage_with_retry(bank_id, settings):
     """
     # Global: Update timestamp.
     global alive_timestamp
-    # Log start.
-    logging.info(f"Starting voltage read for Bank {bank_id}.")
+    # Log start (debug: this runs for every bank on every cycle).
+    logging.debug("Starting voltage read for Bank %d.", bank_id)
     # Validate bank_id.
     if bank_id > settings['num_series_banks']:
         logging.warning(f"Bank {bank_id} exceeds configured num_series_banks ({settings['num_series_banks']}). Cannot read voltage.")
         return None, [], []
-    # Get scaling and calibration.
-    voltage_divider_ratio = settings['VoltageDividerRatio']
+    # Scaling and calibration, precomputed by load_config.
     sensor_id = bank_id
-    calibration_factor = settings[f'Sensor{sensor_id}_Calibration']
+    volts_per_count = settings['bank_volts_per_count'][bank_id - 1]
+    # Conversion time at the configured sample rate (instead of a fixed 50 ms wait).
+    conversion_delay = settings['ADCConversionDelay']
+    # Loop-invariant lookups, hoisted out of the sample loop.
+    multiplexer_address = settings['MultiplexerAddress']
+    conversion_register = settings['ConversionRegister']
     # Retry up to 2 times.
     for attempt in range(2):
         # Update timestamp.
         alive_timestamp = time.time()
-        logging.debug(f"Voltage read attempt {attempt+1} for Bank {bank_id}.")
+        logging.debug("Voltage read attempt %d for Bank %d.", attempt + 1, bank_id)
         # Lists for readings.
         readings = []
         raw_values = []
+        # Channel = bank-1 (0-based).
+        meter_channel = bank_id - 1 # Direct mapping: Bank 1 = Channel 0, Bank 2 = Channel 1, etc.
+        # Select channel on mux and configure ADC (first use only); both samples come from the same meter.
+        # If either fails, reading now would return whichever meter the mux is still on—skip this attempt.
+        if not choose_channel(meter_channel, multiplexer_address):
+            logging.warning("Skipping voltage read attempt for Bank %d: could not select channel %d.", bank_id, meter_channel)
+            continue
+        if not setup_voltage_meter(settings):
+            logging.warning("Skipping voltage read attempt for Bank %d: voltage meter not configured.", bank_id)
+            continue
         # Take 2 samples.
         for _ in range(2):
             # Update timestamp.
             alive_timestamp = time.time()
-            # Channel = bank-1 (0-based).
-            meter_channel = bank_id - 1 # Direct mapping: Bank 1 = Channel 0, Bank 2 = Channel 1, etc.
-            # Select channel on mux.
-            choose_channel(meter_channel, settings['MultiplexerAddress'])
-            # Configure ADC.
-            setup_voltage_meter(settings)
             if bus:
                 try:
-                    # Start conversion (write 0x01?).
-                    bus.write_byte(settings['VoltageMeterAddress'], 0x01)
-                    # Short delay for conversion.
-                    time.sleep(0.05)
+                    # Wait one conversion period so each sample is a fresh conversion.
+                    time.sleep(conversion_delay)
                     # Update timestamp.
                     alive_timestamp = time.time()
-                    # Read 16-bit word from conversion reg, swap bytes (big-endian).
-                    raw_adc = bus.read_word_data(settings['VoltageMeterAddress'], settings['ConversionRegister'])
-                    raw_adc = (raw_adc & 0xFF) << 8 | (raw_adc >> 8)
+                    # Read 16-bit word from conversion reg.
+                    raw_adc = read_adc_word(settings, conversion_register)
                 except IOError as e:
-                    logging.error(f"I2C error in voltage read for Bank {bank_id}: {str(e)}")
+                    logging.error("I2C error in voltage read for Bank %d: %s", bank_id, e)
+                    # Meter may have reset—configure it again next time.
+                    configured_meters.discard(meter_channel)
                     raw_adc = 0
             else:
                 # Test mode: Fake value.
                 raw_adc = 16000 + bank_id * 100
             # Log raw.
-            logging.debug(f"Raw ADC for Bank {bank_id} (Sensor {sensor_id}): {raw_adc}")
+            logging.debug("Raw ADC for Bank %d (Sensor %d): %d", bank_id, sensor_id, raw_adc)
             # Convert if non-zero.
             if raw_adc != 0:
-                # ADS1115 formula: Raw * (full scale / 32767), full scale 6.144V for gain.
-                measured_voltage = raw_adc * (6.144 / 32767)
-                # Apply divider and calibration.
-                actual_voltage = (measured_voltage / voltage_divider_ratio) * calibration_factor
+                # ADS1115 formula with divider and calibration applied (one multiply).
+                actual_voltage = raw_adc * volts_per_count
                 readings.append(actual_voltage)
                 raw_values.append(raw_adc)
             else:
                 # Zero reading.
                 readings.append(0.0)
                 raw_values.append(0)
-        # If readings, average.
-        if readings:
-            average = sum(readings) / len(readings)
-            # Filter valid: Within 5% of average.
-            valid_readings = [r for r in readings if abs(r - average) / (average if average != 0 else 1) <= 0.05]
-            valid_adc = [raw_values[i] for i, r in enumerate(readings) if abs(r - average) / (average if average != 0 else 1) <= 0.05]
-            if valid_readings:
-                # Success—average valids.
-                logging.info(f"Voltage read successful for Bank {bank_id}: {average:.2f}V.")
-                return sum(valid_readings) / len(valid_readings), valid_readings, valid_adc
+        # Average, dropping samples more than 5% off.
+        result = average_valid_readings(readings, raw_values)
+        if result[0] is not None:
+            # Success.
+            logging.debug("Voltage read successful for Bank %d: %.2fV.", bank_id, result[0])
+            return result
         # Inconsistent—retry.
-        logging.debug(f"Readings for Bank {bank_id} inconsistent, retrying.")
+        logging.debug("Readings for Bank %d inconsistent, retrying.", bank_id)
     # All retries failed.
     logging.error(f"Couldn't get good voltage reading for Bank {bank_id} after 2 tries.")
     return None, [], []
 
+def read_all_voltages(settings):
+    """
+    Read the voltage of every bank in one pass, overlapping the ADC conversions.
+    Each bank has its own ADS1115 behind the multiplexer, so all of them are configured first and then
+    convert at the same time; the conversion wait is paid once per sample round instead of once per bank,
+    and meters already converting from an earlier poll are neither reconfigured nor waited for before the
+    first round. Banks whose channel can't be selected or whose samples disagree fall back to read_voltage_with_retry. Non-programmer: Like starting
+    all the kettles at once and checking them together, instead of boiling one at a time.
+    
+    Args:
+        settings (dict): Config for calibration, ratios, etc.
+    
+    Returns:
+        list: Average voltage per bank (float, or None if the bank could not be read), bank 1 first.
+    """
+    # Global: Update timestamp.
+    global alive_timestamp
+    num_banks = settings['num_series_banks']
+    # Test mode: No bus, so nothing to overlap—use the normal per-bank read.
+    if not bus:
+        return [read_voltage_with_retry(bank_id, settings)[0] for bank_id in range(1, num_banks + 1)]
+    logging.debug("Starting voltage read for all %d banks.", num_banks)
+    conversion_delay = settings['ADCConversionDelay']
+    # Loop-invariant lookups, hoisted out of the per-bank loops.
+    multiplexer_address = settings['MultiplexerAddress']
+    conversion_register = settings['ConversionRegister']
+    bank_range = range(1, num_banks + 1)
+    # Banks whose channel or meter could not be set up; they are read on their own afterwards.
+    failed = set()
+    # Configure only meters that aren't already converting (channel = bank-1).
+    meters_running = True # Stays True if every meter kept converting since an earlier poll.
+    for bank_id in bank_range:
+        if bank_id - 1 in configured_meters:
+            continue
+        meters_running = False
+        if not choose_channel(bank_id - 1, multiplexer_address) or not setup_voltage_meter(settings):
+            failed.add(bank_id)
+    # Samples per bank, 2 rounds.
+    raw_samples = [[] for _ in range(num_banks)]
+    for sample in range(2):
+        # One conversion period covers all meters, since they run in parallel. Meters that were already
+        # running hold a fresh result, so the first round needs no wait.
+        if sample or not meters_running:
+            time.sleep(conversion_delay)
+        alive_timestamp = time.time()
+        for bank_id in bank_range:
+            if bank_id in failed:
+                continue
+            if not choose_channel(bank_id - 1, multiplexer_address):
+                # Reading now would return another bank's meter.
+                failed.add(bank_id)
+                continue
+            try:
+                # Read 16-bit word from conversion reg.
+                raw_adc = read_adc_word(settings, conversion_register)
+            except IOError as e:
+                logging.error("I2C error in voltage read for Bank %d: %s", bank_id, e)
+                # Meter may have reset—configure it again next time.
+                configured_meters.discard(bank_id - 1)
+                raw_adc = 0
+            raw_samples[bank_id - 1].append(raw_adc)
+    # Convert and filter per bank.
+    voltages = []
+    for bank_id, (raw_values, volts_per_count) in enumerate(zip(raw_samples, settings['bank_volts_per_count']), start=1):
+        if bank_id in failed:
+            # Channel or meter setup failed—retry this bank on its own.
+            logging.debug("Bank %d could not be selected, retrying individually.", bank_id)
+            voltages.append(read_voltage_with_retry(bank_id, settings)[0])
+            continue
+        readings = [raw_adc * volts_per_count for raw_adc in raw_values]
+        logging.debug("Raw ADC for Bank %d: %s", bank_id, raw_values)
+        average, _, _ = average_valid_readings(readings, raw_values)
+        if average is None:
+            # Inconsistent—retry this bank on its own.
+            logging.debug("Readings for Bank %d inconsistent, retrying individually.", bank_id)
+            average = read_voltage_with_retry(bank_id, settings)[0]
+        voltages.append(average)
+    alive_timestamp = time.time()
+    return voltages
+
 def set_relay_connection(high, low, settings):
     """
     Set relay connections for balancing between high and low banks using GPIO.
-    Looks up the relays for the pair in relay_mapping, sets corresponding GPIO pins HIGH to activate.
-    For reset (high=0, low=0), sets all relay pins LOW. Assumes active-high relays.
+    Looks up the GPIO pins for the pair in relay_pin_table (built from relay_mapping by load_config),
+    sets them HIGH to activate. For reset (high=0, low=0), sets all relay pins LOW. Assumes active-high relays.
+    Does nothing if the relays are already in the requested state (e.g., repeated resets while idle).
     
     Args:
         high (int): Source bank (higher voltage), or 0 for reset.
         low (int): Destination bank, or 0 for reset.
-        settings (dict): Config with relay_mapping and Relay{i}_Pin.
+        settings (dict): Config with relay_pin_table and relay_all_pins.
     
     Returns:
         None
     """
+    # Global: Last state written.
+    global last_relay_pair
+    # Already set this way—skip the GPIO writes.
+    if (high, low) == last_relay_pair:
+        logging.debug("Relays already set for %d-%d; no change.", high, low)
+        return
     try:
-        # Validate banks unless reset.
-        if high != 0 and low != 0:
-            if high > settings['num_series_banks'] or low > settings['num_series_banks']:
-                logging.warning(f"Bank {high} or {low} exceeds configured num_series_banks ({settings['num_series_banks']}). Cannot balance.")
-                return
-            logging.info(f"Attempting to set GPIO relays for connection from Bank {high} to {low}")
-        else:
-            logging.info("Resetting all GPIO relays to off")
-        
         # Reset: Set all relay pins LOW
         if high == 0 and low == 0:
-            for i in range(4):  # Assuming 4 relays
-                pin = settings[f'Relay{i}_Pin']
+            logging.info("Resetting all GPIO relays to off")
+            for pin in settings['relay_all_pins']:
                 GPIO.output(pin, GPIO.LOW)
+            last_relay_pair = (0, 0)
             logging.info("All relays deactivated")
             return
         
-        # Key for mapping (e.g., '1-2')
-        pair_key = f"{high}-{low}"
-        if pair_key in settings.get('relay_mapping', {}):
-            relays = settings['relay_mapping'][pair_key]
-            logging.debug(f"Activating relays {relays} for {pair_key}")
-            # First, deactivate all relays to ensure clean state
-            for i in range(4):
-                pin = settings[f'Relay{i}_Pin']
-                GPIO.output(pin, GPIO.LOW)
-            # Activate specific relays
-            for relay in relays:
-                if 0 <= relay < 4:  # Validate relay index
-                    pin = settings[f'Relay{relay}_Pin']
-                    GPIO.output(pin, GPIO.HIGH)
-                    logging.debug(f"Relay {relay} on pin {pin} activated")
-                else:
-                    logging.warning(f"Invalid relay index {relay} for {pair_key}")
-        else:
-            logging.warning(f"No relay mapping found for {pair_key}. Cannot balance.")
+        logging.info(f"Attempting to set GPIO relays for connection from Bank {high} to {low}")
+        
+        # Pins for this pair (precomputed lookup). Unknown pairs, same-bank pairs and banks beyond
+        # num_series_banks have no entry, so this one lookup is the whole validation.
+        pins = settings['relay_pin_table'].get((high, low))
+        if pins is None:
+            logging.warning(f"No relay mapping found for {high}-{low} (num_series_banks = {settings['num_series_banks']}). Cannot balance.")
             return
+        logging.debug(f"Activating relay pins {pins} for {high}-{low}")
+        # First, deactivate all relays to ensure clean state
+        for pin in settings['relay_all_pins']:
+            GPIO.output(pin, GPIO.LOW)
+        # Activate specific relays
+        for pin in pins:
+            GPIO.output(pin, GPIO.HIGH)
+        last_relay_pair = (high, low)
         
         logging.info(f"GPIO relay setup completed for balancing from Bank {high} to {low}")
     except Exception as e:
+        # Relay state unknown—write again next time.
+        last_relay_pair = None
         logging.error(f"Error in set_relay_connection: {e}")
 
 def control_dcdc_converter(turn_on, settings):
@@ -1511,10 +1729,103 @@ def control_dcdc_converter(turn_on, settings):
     except Exception as e:
         logging.error(f"Problem controlling DC-DC converter: {e}")
 
+def open_smtp_connection(settings):
+    """
+    Connect to the SMTP server, enable TLS and log in (if credentials are set).
+    Non-programmer: Like dialing the post office and showing your ID before handing over letters.
+    
+    Args:
+        settings (dict): SMTP config.
+    
+    Returns:
+        smtplib.SMTP: Ready-to-use connection.
+    """
+    # Connect to SMTP server.
+    server = smtplib.SMTP(settings['SMTP_Server'], settings['SMTP_Port'], timeout=30)
+    try:
+        # Enable TLS encryption.
+        server.starttls()
+        # Login if credentials provided.
+        if settings['SMTP_Username'] and settings['SMTP_Password']:
+            server.login(settings['SMTP_Username'], settings['SMTP_Password'])
+    except Exception:
+        server.close()
+        raise
+    return server
+
+def close_smtp_connection(server):
+    """
+    Politely close an SMTP connection, ignoring errors if it is already broken.
+    
+    Args:
+        server (smtplib.SMTP): Connection to close.
+    
+    Returns:
+        None
+    """
+    try:
+        server.quit()
+    except Exception:
+        server.close()
+
+def email_worker():
+    """
+    Background thread that sends queued alert emails one at a time.
+    Takes each message from email_queue and sends it over a reused SMTP connection: connects and logs in on first use,
+    reconnects and retries once if the server dropped the connection, and closes it after SMTP_IDLE_SECONDS without mail
+    (servers drop idle clients anyway). If sending fails, clears the throttle timer so the next alert tries again
+    (same as when sending happened in the main loop).
+    Non-programmer: Like a mail carrier who takes letters from the outbox so you don't have to wait at the post office.
+    
+    Returns:
+        None: Runs forever (daemon thread).
+    """
+    # Global: Reset throttle on failure.
+    global last_email_time
+    # Open connection (None when not connected).
+    server = None
+    while True:
+        # Wait for the next message; while connected, only wait until the idle limit.
+        try:
+            msg, message, settings = email_queue.get(timeout=SMTP_IDLE_SECONDS if server else None)
+        except queue.Empty:
+            # Idle too long—hang up.
+            close_smtp_connection(server)
+            server = None
+            logging.debug("Closed idle SMTP connection.")
+            continue
+        try:
+            # Try the existing connection first, then once more on a fresh one.
+            for attempt in range(2):
+                if server is None:
+                    server = open_smtp_connection(settings)
+                try:
+                    # Send the message.
+                    server.send_message(msg)
+                    break
+                except smtplib.SMTPException:
+                    # Stale or rejected connection—drop it; retry once on a new connection.
+                    close_smtp_connection(server)
+                    server = None
+                    if attempt == 1:
+                        raise
+            # Log the plain alert text (the MIME body may be base64, e.g. for alerts with "°C").
+            logging.info("Alert email sent: %s", message)
+        except Exception as e:
+            # Allow the next alert to retry right away.
+            last_email_time = 0
+            if server is not None:
+                close_smtp_connection(server)
+                server = None
+            logging.error("Failed to send alert email: %s", e)
+        finally:
+            email_queue.task_done()
+
 def send_alert_email(message, settings):
     """
-    Send an email alert if enough time has passed since last one (throttled).
-    Builds MIME message, connects to SMTP, logs in, sends. Non-programmer: Like texting an alert but with spam control.
+    Queue an email alert if enough time has passed since last one (throttled).
+    Builds MIME message and hands it to the background email thread, so a slow or unreachable
+    SMTP server never stalls monitoring. Non-programmer: Like texting an alert but with spam control.
     
     Args:
         message (str): Alert text body.
@@ -1524,7 +1835,7 @@ def send_alert_email(message, settings):
         None
     """
     # Global: Check throttle.
-    global last_email_time
+    global last_email_time, email_thread
     if time.time() - last_email_time < settings['EmailAlertIntervalSeconds']:
         logging.debug("Skipping alert email to avoid flooding.")
         return
@@ -1534,20 +1845,19 @@ def send_alert_email(message, settings):
         msg['Subject'] = "Battery Monitor Alert"
         msg['From'] = settings['SenderEmail']
         msg['To'] = settings['RecipientEmail']
-        # Connect to SMTP server.
-        with smtplib.SMTP(settings['SMTP_Server'], settings['SMTP_Port']) as server:
-            # Enable TLS encryption.
-            server.starttls()
-            # Login if credentials provided.
-            if settings['SMTP_Username'] and settings['SMTP_Password']:
-                server.login(settings['SMTP_Username'], settings['SMTP_Password'])
-            # Send the message.
-            server.send_message(msg)
-        # Update timer.
+        # Stamp the alert time now; the email thread may send it a little later.
+        msg['Date'] = formatdate(localtime=True)
+        # Start the sender thread on first use.
+        if email_thread is None or not email_thread.is_alive():
+            email_thread = threading.Thread(target=email_worker, daemon=True)
+            email_thread.start()
+        # Hand off to the sender thread (with the plain text for its log line).
+        email_queue.put_nowait((msg, message, settings))
+        # Update timer (counts from queueing, so bursts of alerts don't queue up many emails).
         last_email_time = time.time()
-        logging.info(f"Alert email sent: {message}")
+        logging.info("Alert email queued.")
     except Exception as e:
-        logging.error(f"Failed to send alert email: {e}")
+        logging.error(f"Failed to queue alert email: {e}")
 
 def check_for_issues(voltages, temps_alerts, settings):
     """
@@ -1577,54 +1887,47 @@ def check_for_issues(voltages, temps_alerts, settings):
     # Add balancer flag alert.
     if balancer_failed:
         alerts.append("Balancer hardware failure detected - balancing disabled.")
-    # Check each voltage.
+    # Classify every bank first, then act once on the result.
+    high_limit = settings['HighVoltageThresholdPerBattery']
+    low_limit = settings['LowVoltageThresholdPerBattery']
+    voltage_alerts = []
     for i, v in enumerate(voltages, 1):
         if v is None or v == 0.0:
             # Zero/None: Disconnected or error.
-            alert = f"Bank {i}: Zero voltage."
-            alerts.append(alert)
-            event_log.append(f"{time.strftime('%Y-%m-%d %H:%M:%S')}: {alert}")
-            if len(event_log) > settings.get('EventLogSize', 20):
-                event_log.pop(0)
-            logging.warning(f"Zero voltage alert on Bank {i}.")
-            alert_needed = True
-        elif v > settings['HighVoltageThresholdPerBattery']:
+            voltage_alerts.append(f"Bank {i}: Zero voltage.")
+        elif v > high_limit:
             # Overvoltage.
-            alert = f"Bank {i}: High voltage ({v:.2f}V)."
-            alerts.append(alert)
-            event_log.append(f"{time.strftime('%Y-%m-%d %H:%M:%S')}: {alert}")
-            if len(event_log) > settings.get('EventLogSize', 20):
-                event_log.pop(0)
-            logging.warning(f"High voltage alert on Bank {i}: {v:.2f}V.")
-            alert_needed = True
-        elif v < settings['LowVoltageThresholdPerBattery']:
+            voltage_alerts.append(f"Bank {i}: High voltage ({v:.2f}V).")
+        elif v < low_limit:
             # Undervoltage.
-            alert = f"Bank {i}: Low voltage ({v:.2f}V)."
-            alerts.append(alert)
-            event_log.append(f"{time.strftime('%Y-%m-%d %H:%M:%S')}: {alert}")
+            voltage_alerts.append(f"Bank {i}: Low voltage ({v:.2f}V).")
+    if voltage_alerts:
+        # One warning listing every offending bank, not just the first.
+        logging.warning("Voltage alerts: %s", " ".join(voltage_alerts))
+        timestamp = time.strftime('%Y-%m-%d %H:%M:%S')
+        for alert in voltage_alerts:
+            event_log.append(f"{timestamp}: {alert}")
             if len(event_log) > settings.get('EventLogSize', 20):
                 event_log.pop(0)
-            logging.warning(f"Low voltage alert on Bank {i}: {v:.2f}V.")
-            alert_needed = True
+        alerts.extend(voltage_alerts)
+        alert_needed = True
     # Add temp alerts.
     if temps_alerts:
         alerts.extend(temps_alerts)
         alert_needed = True
-    # If alerts needed, activate hardware alarm and send email.
+    # Single relay write: on if any issue, off otherwise.
+    if GPIO:
+        GPIO.output(settings['AlarmRelayPin'], GPIO.HIGH if alert_needed else GPIO.LOW)  # Buzzer/light.
     if alert_needed:
-        if GPIO:
-            GPIO.output(settings['AlarmRelayPin'], GPIO.HIGH)  # Turn on buzzer/light.
         logging.info("Alarm relay activated.")
+        # One email summarizing all alerts.
         send_alert_email("\n".join(alerts), settings)
     else:
-        # No issues—deactivate alarm.
-        if GPIO:
-            GPIO.output(settings['AlarmRelayPin'], GPIO.LOW)
         logging.info("No issues; alarm relay deactivated.")
     # Return status and full alerts.
     return alert_needed, alerts
 
-def balance_battery_voltages(stdscr, high, low, settings, temps_alerts, is_heating=False):
+def balance_battery_voltages(stdscr, high, low, settings, temps_alerts, is_heating=False, voltages=None):
     """
     Balance the charge between two battery banks by transferring energy from high to low voltage.
     This function is like a water leveler for batteries. When one battery bank has more "energy level"
@@ -1644,6 +1947,7 @@ def balance_battery_voltages(stdscr, high, low, settings, temps_alerts, is_heati
         settings (dict): Timings, thresholds, etc.
         temps_alerts (list): Temp issues—skips if any.
         is_heating (bool): True if for heating (ignore voltage diff).
+        voltages (list): Bank voltages just read by the caller, used as the starting values instead of reading again (optional).
     
     Returns:
         None
@@ -1665,9 +1969,13 @@ def balance_battery_voltages(stdscr, high, low, settings, temps_alerts, is_heati
     # Set flags.
     balancing_active = True
     web_data['balancing'] = True
-    # Read initial voltages.
-    initial_high_v, _, _ = read_voltage_with_retry(high, settings)
-    initial_low_v, _, _ = read_voltage_with_retry(low, settings)
+    # Initial voltages: reuse the caller's fresh readings if given, else read.
+    if voltages is not None:
+        initial_high_v = voltages[high - 1]
+        initial_low_v = voltages[low - 1]
+    else:
+        initial_high_v, _, _ = read_voltage_with_retry(high, settings)
+        initial_low_v, _, _ = read_voltage_with_retry(low, settings)
     # Skip if low is zero.
     if initial_low_v == 0.0:
         logging.warning(f"Cannot balance to Bank {low} (0.00V). Skipping.")
@@ -1718,18 +2026,18 @@ def balance_battery_voltages(stdscr, high, low, settings, temps_alerts, is_heati
         # Display on TUI if space.
         if progress_y < height and right_half_x + 50 < width:
             try:
-                stdscr.addstr(progress_y, right_half_x, f"{mode} Balancing Bank {high} ({voltage_high:.2f}V) -> Bank {low} ({voltage_low:.2f}V)... [{animation_frames[frame_index % 4]}]", curses.color_pair(6))
+                stdscr.addstr(progress_y, right_half_x, f"{mode} Balancing Bank {high} ({voltage_high:.2f}V) -> Bank {low} ({voltage_low:.2f}V)... [{animation_frames[frame_index % 4]}]", COLOR_PAIRS[6])
             except curses.error:
                 logging.warning("addstr error for balancing status.")
             try:
-                stdscr.addstr(progress_y + 1, right_half_x, f"Progress: [{bar}] {int(progress * 100)}%", curses.color_pair(6))
+                stdscr.addstr(progress_y + 1, right_half_x, f"Progress: [{bar}] {int(progress * 100)}%", COLOR_PAIRS[6])
             except curses.error:
                 logging.warning("addstr error for balancing progress bar.")
         else:
             logging.warning("Skipping balancing progress display - out of bounds.")
         stdscr.refresh()
         # Log progress.
-        logging.debug(f"Balancing progress: {progress * 100:.2f}%, High: {voltage_high:.2f}V, Low: {voltage_low:.2f}V")
+        logging.debug("Balancing progress: %.2f%%, High: %.2fV, Low: %.2fV", progress * 100, voltage_high, voltage_low)
         frame_index += 1
         # Short sleep for animation.
         time.sleep(0.01)
@@ -1920,21 +2228,14 @@ def draw_tui(stdscr, voltages, calibrated_temps, raw_temps, offsets, bank_stats,
     Returns:
         None
     """
+    # Globals: Per-frame caches.
+    global local_ip_address, local_ip_checked, total_voltage_art
     # Log refresh.
     logging.debug("Refreshing TUI.")
-    # Clear screen.
-    stdscr.clear()
-    # Setup colors.
-    curses.start_color()
-    curses.use_default_colors()
-    curses.init_pair(1, curses.COLOR_RED, -1)
-    curses.init_pair(2, curses.COLOR_RED, -1)
-    curses.init_pair(3, curses.COLOR_YELLOW, -1)
-    curses.init_pair(4, curses.COLOR_GREEN, -1)
-    curses.init_pair(5, curses.COLOR_WHITE, -1)
-    curses.init_pair(6, curses.COLOR_YELLOW, -1)
-    curses.init_pair(7, curses.COLOR_CYAN, -1)
-    curses.init_pair(8, curses.COLOR_MAGENTA, -1)
+    # Blank the screen buffer. erase() (unlike clear()) doesn't force a full terminal repaint,
+    # so refresh() only sends the characters that actually changed since the last frame.
+    stdscr.erase()
+    # Colors were set up once in main (see COLOR_PAIRS).
     # Screen size.
     height, width = stdscr.getmaxyx()
     right_half_x = width // 2
@@ -1942,10 +2243,12 @@ def draw_tui(stdscr, voltages, calibrated_temps, raw_temps, offsets, bank_stats,
     total_v = sum(voltages)
     total_high = settings['HighVoltageThresholdPerBattery'] * NUM_BANKS
     total_low = settings['LowVoltageThresholdPerBattery'] * NUM_BANKS
-    v_color = curses.color_pair(2) if total_v > total_high else curses.color_pair(3) if total_v < total_low else curses.color_pair(4)
-    # ASCII art for total V.
-    roman_v = text2art(f"{total_v:.2f}V", font='roman', chr_ignore=True)
-    roman_lines = roman_v.splitlines()
+    v_color = COLOR_PAIRS[2] if total_v > total_high else COLOR_PAIRS[3] if total_v < total_low else COLOR_PAIRS[4]
+    # ASCII art for total V (rendering is slow, so reuse the last one if the text is the same).
+    total_v_str = f"{total_v:.2f}V"
+    if total_voltage_art[0] != total_v_str:
+        total_voltage_art = (total_v_str, text2art(total_v_str, font='roman', chr_ignore=True).splitlines())
+    roman_lines = total_voltage_art[1]
     # Draw art lines.
     for i, line in enumerate(roman_lines):
         if i + 1 < height and len(line) < right_half_x:
@@ -1989,7 +2292,7 @@ def draw_tui(stdscr, voltages, calibrated_temps, raw_temps, offsets, bank_stats,
         full_line = gap.join([line] * NUM_BANKS)
         if y_offset + row < height and len(full_line) < right_half_x:
             try:
-                stdscr.addstr(y_offset + row, 0, full_line, curses.color_pair(4))
+                stdscr.addstr(y_offset + row, 0, full_line, COLOR_PAIRS[4])
             except curses.error:
                 logging.warning(f"addstr error for art row {row}.")
         else:
@@ -1999,10 +2302,10 @@ def draw_tui(stdscr, voltages, calibrated_temps, raw_temps, offsets, bank_stats,
         start_pos = bank_id * (art_width + gap_len)
         v_str = f"{voltages[bank_id]:.2f}V" if voltages[bank_id] > 0 else "0.00V"
         # Color based on status.
-        v_color = curses.color_pair(8) if voltages[bank_id] == 0.0 else \
-                 curses.color_pair(2) if voltages[bank_id] > settings['HighVoltageThresholdPerBattery'] else \
-                 curses.color_pair(3) if voltages[bank_id] < settings['LowVoltageThresholdPerBattery'] else \
-                 curses.color_pair(4)
+        v_color = COLOR_PAIRS[8] if voltages[bank_id] == 0.0 else \
+                 COLOR_PAIRS[2] if voltages[bank_id] > settings['HighVoltageThresholdPerBattery'] else \
+                 COLOR_PAIRS[3] if voltages[bank_id] < settings['LowVoltageThresholdPerBattery'] else \
+                 COLOR_PAIRS[4]
         v_center = start_pos + (art_width - len(v_str)) // 2
         v_y = y_offset + 2
         if v_y < height and v_center + len(v_str) < right_half_x:
@@ -2019,7 +2322,7 @@ def draw_tui(stdscr, voltages, calibrated_temps, raw_temps, offsets, bank_stats,
         max_str = f"Max: {summary['max']:.1f}°C"
         inv_str = f"Inv: {summary['invalid']}"
         # Color for summary.
-        s_color = curses.color_pair(2) if summary['median'] > settings['high_threshold'] or summary['median'] < settings['low_threshold'] or summary['invalid'] > 0 else curses.color_pair(4)
+        s_color = COLOR_PAIRS[2] if summary['median'] > settings['high_threshold'] or summary['median'] < settings['low_threshold'] or summary['invalid'] > 0 else COLOR_PAIRS[4]
         for idx, s_str in enumerate([med_str, min_str, max_str, inv_str]):
             s_center = start_pos + (art_width - len(s_str)) // 2
             s_y = y_offset + 7 + idx
@@ -2036,7 +2339,7 @@ def draw_tui(stdscr, voltages, calibrated_temps, raw_temps, offsets, bank_stats,
     for bank_id in range(NUM_BANKS):
         if y_offset < height:
             try:
-                stdscr.addstr(y_offset, 0, f"Bank {bank_id+1} Temps:", curses.color_pair(7))
+                stdscr.addstr(y_offset, 0, f"Bank {bank_id+1} Temps:", COLOR_PAIRS[7])
             except curses.error:
                 logging.warning(f"addstr error for bank {bank_id+1} temps header.")
         y_offset += 1
@@ -2056,10 +2359,10 @@ def draw_tui(stdscr, voltages, calibrated_temps, raw_temps, offsets, bank_stats,
                 detail = ""
             t_str = f"Bat {bat_id} Local C{local_ch}: {calib_str}{detail}"
             # Color.
-            t_color = curses.color_pair(8) if "Inv" in calib_str else \
-                     curses.color_pair(2) if calib > settings['high_threshold'] else \
-                     curses.color_pair(3) if calib < settings['low_threshold'] else \
-                     curses.color_pair(4)
+            t_color = COLOR_PAIRS[8] if "Inv" in calib_str else \
+                     COLOR_PAIRS[2] if calib > settings['high_threshold'] else \
+                     COLOR_PAIRS[3] if calib < settings['low_threshold'] else \
+                     COLOR_PAIRS[4]
             if y_offset < height and len(t_str) < right_half_x:
                 try:
                     stdscr.addstr(y_offset, 0, t_str, t_color)
@@ -2072,7 +2375,7 @@ def draw_tui(stdscr, voltages, calibrated_temps, raw_temps, offsets, bank_stats,
     med_str = f"{startup_median:.1f}°C" if startup_median else "N/A"
     if y_offset < height:
         try:
-            stdscr.addstr(y_offset, 0, f"Startup Median Temp: {med_str}", curses.color_pair(7))
+            stdscr.addstr(y_offset, 0, f"Startup Median Temp: {med_str}", COLOR_PAIRS[7])
         except curses.error:
             logging.warning("addstr error for startup median.")
     else:
@@ -2081,7 +2384,7 @@ def draw_tui(stdscr, voltages, calibrated_temps, raw_temps, offsets, bank_stats,
     # Alerts section.
     if y_offset < height:
         try:
-            stdscr.addstr(y_offset, 0, "Alerts:", curses.color_pair(7))
+            stdscr.addstr(y_offset, 0, "Alerts:", COLOR_PAIRS[7])
         except curses.error:
             logging.warning("addstr error for alerts header.")
     y_offset += 1
@@ -2089,7 +2392,7 @@ def draw_tui(stdscr, voltages, calibrated_temps, raw_temps, offsets, bank_stats,
         for alert in alerts:
             if y_offset < height and len(alert) < right_half_x:
                 try:
-                    stdscr.addstr(y_offset, 0, alert, curses.color_pair(8))
+                    stdscr.addstr(y_offset, 0, alert, COLOR_PAIRS[8])
                 except curses.error:
                     logging.warning(f"addstr error for alert '{alert}'.")
             else:
@@ -2098,20 +2401,23 @@ def draw_tui(stdscr, voltages, calibrated_temps, raw_temps, offsets, bank_stats,
     else:
         if y_offset < height:
             try:
-                stdscr.addstr(y_offset, 0, "No alerts.", curses.color_pair(4))
+                stdscr.addstr(y_offset, 0, "No alerts.", COLOR_PAIRS[4])
             except curses.error:
                 logging.warning("addstr error for no alerts message.")
         else:
             logging.warning("Skipping no alerts message - out of bounds.")
-    # Get local IP for web URL.
-    local_ip = 'localhost'
-    try:
-        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        s.connect(("8.8.8.8", 80))
-        local_ip = s.getsockname()[0]
-        s.close()
-    except Exception:
-        local_ip = socket.gethostbyname(socket.gethostname())
+    # Get local IP for web URL (cached; refreshed every IP_REFRESH_SECONDS in case the network changed).
+    now = time.monotonic()
+    if local_ip_checked is None or now - local_ip_checked >= IP_REFRESH_SECONDS:
+        local_ip_checked = now
+        try:
+            s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            s.connect(("8.8.8.8", 80))
+            local_ip_address = s.getsockname()[0]
+            s.close()
+        except Exception:
+            local_ip_address = socket.gethostbyname(socket.gethostname())
+    local_ip = local_ip_address
     # Config display in right half.
     y_config = 3
     config_lines = [
@@ -2144,14 +2450,14 @@ def draw_tui(stdscr, voltages, calibrated_temps, raw_temps, offsets, bank_stats,
         row = i % 20
         if col < num_cols and y_config + row < height:
             try:
-                stdscr.addstr(y_config + row, right_half_x + col * col_width, line, curses.color_pair(7))
+                stdscr.addstr(y_config + row, right_half_x + col * col_width, line, COLOR_PAIRS[7])
             except curses.error:
                 pass
     # Event history in bottom right.
     y_offset = height // 2
     if y_offset < height:
         try:
-            stdscr.addstr(y_offset, right_half_x, "Event History:", curses.color_pair(7))
+            stdscr.addstr(y_offset, right_half_x, "Event History:", COLOR_PAIRS[7])
         except curses.error:
             logging.warning("addstr error for event history header.")
     y_offset += 1
@@ -2159,7 +2465,7 @@ def draw_tui(stdscr, voltages, calibrated_temps, raw_temps, offsets, bank_stats,
     for event in event_log[-20:]:
         if y_offset < height and len(event) < width - right_half_x:
             try:
-                stdscr.addstr(y_offset, right_half_x, event, curses.color_pair(5))
+                stdscr.addstr(y_offset, right_half_x, event, COLOR_PAIRS[5])
             except curses.error:
                 logging.warning(f"addstr error for event '{event}'.")
             y_offset += 1
@@ -2365,7 +2671,7 @@ def startup_self_test(settings, stdscr, data_dir):
         try:
             if bus:
                 logging.debug(f"Selecting I2C channel 0 on multiplexer 0x{settings['MultiplexerAddress']:02x}")
-                choose_channel(0, settings['MultiplexerAddress'])
+                choose_channel(0, settings['MultiplexerAddress'], force=True)
                 logging.debug(f"Reading byte from VoltageMeter at 0x{settings['VoltageMeterAddress']:02x}")
                 bus.read_byte(settings['VoltageMeterAddress'])
                 logging.debug("I2C connectivity test passed for voltage meter.")
@@ -3000,10 +3306,11 @@ def start_web_server(settings):
         voltages = web_data['voltages']
         if len(voltages) < 2:
             return jsonify({'success': False, 'message': 'Not enough battery banks'}), 400
-        max_v = max(voltages)
-        min_v = min(voltages)
-        high_bank = voltages.index(max_v) + 1
-        low_bank = voltages.index(min_v) + 1
+        # Highest/lowest bank positions directly (no second search with index()).
+        high_bank = max(range(len(voltages)), key=voltages.__getitem__) + 1
+        low_bank = min(range(len(voltages)), key=voltages.__getitem__) + 1
+        max_v = voltages[high_bank - 1]
+        min_v = voltages[low_bank - 1]
         if max_v - min_v < settings['VoltageDifferenceToBalance']:
             return jsonify({'success': False, 'message': 'Voltage difference too small for balancing'}), 400
         balancing_active = True
@@ -3062,6 +3369,8 @@ def main(stdscr):
     curses.init_pair(6, curses.COLOR_YELLOW, -1)
     curses.init_pair(7, curses.COLOR_CYAN, -1)
     curses.init_pair(8, curses.COLOR_MAGENTA, -1)
+    # Look up the color attributes once for all drawing code.
+    COLOR_PAIRS[:] = [curses.color_pair(i) for i in range(9)]
     stdscr.nodelay(True)
     # Globals.
     global previous_temps, previous_bank_medians, run_count, startup_offsets, startup_median, startup_set, battery_voltages, web_data, balancing_active, BANK_SENSOR_INDICES, alive_timestamp, NUM_BANKS, balancer_failed
@@ -3107,8 +3416,18 @@ def main(stdscr):
     previous_temps = [None] * total_channels
     previous_bank_medians = [0.0] * NUM_BANKS
     alive_timestamp = time.time()
+    # Smoothed bank voltages for balance decisions (None until first read).
+    filtered_voltages = None
+    # True after a balance until the banks settle below the threshold—then a bigger diff is needed to start again.
+    balance_hysteresis_active = False
+    # What the TUI last showed (None = redraw); the screen is only redrawn when this changes.
+    tui_snapshot = None
+    # Poll schedule on the monotonic clock (not affected by system clock changes).
+    next_poll = time.monotonic()
     # Main loop.
     while True:
+        # Deadline for the next cycle—fixed cadence regardless of how long this cycle takes.
+        next_poll += settings['poll_interval']
         # Temps alerts.
         temps_alerts = [] # List to collect any temperature problems we find
         all_raw_temps = [] # Will hold all raw temperature readings from all sensors
@@ -3189,30 +3508,40 @@ def main(stdscr):
                 GPIO.output(settings['FanRelayPin'], GPIO.LOW)
             logging.info("Cabinet temp normal. Fan deactivated.")
         # Read voltages.
-        battery_voltages = []
-        for i in range(1, NUM_BANKS + 1):
-            v, _, _ = read_voltage_with_retry(i, settings) # Read voltage with error handling
-            battery_voltages.append(v if v is not None else 0.0) # Use 0.0 if reading failed
+        # All banks convert in parallel; 0.0 if a bank's reading failed.
+        battery_voltages = [v if v is not None else 0.0 for v in read_all_voltages(settings)]
         # Check issues.
         alert_needed, all_alerts = check_for_issues(battery_voltages, temps_alerts, settings)
         # Update RRD.
         timestamp = int(time.time())
         values = f"{timestamp}:{overall_median}:{':'.join(map(str, battery_voltages))}"
         subprocess.call(['rrdtool', 'update', RRD_FILE, values])
-        logging.debug(f"RRD updated with: {values}")
+        logging.debug("RRD updated with: %s", values)
+        # Smooth voltages (exponential filter) so ADC noise doesn't flip the high/low choice; failed (0.0) reads pass straight through.
+        alpha = settings['VoltageFilterAlpha']
+        if filtered_voltages is None or len(filtered_voltages) != len(battery_voltages):
+            filtered_voltages = battery_voltages[:]
+        else:
+            filtered_voltages = [fv + alpha * (v - fv) if v > 0 and fv > 0 else v for v, fv in zip(battery_voltages, filtered_voltages)]
         # Balance decision.
         if len(battery_voltages) == NUM_BANKS and not balancer_failed:
-            max_v = max(battery_voltages) # Find highest voltage bank
-            min_v = min(battery_voltages) # Find lowest voltage bank
-            high_b = battery_voltages.index(max_v) + 1 # Bank number with highest voltage
-            low_b = battery_voltages.index(min_v) + 1 # Bank number with lowest voltage
+            high_b = max(range(NUM_BANKS), key=filtered_voltages.__getitem__) + 1 # Bank number with highest voltage
+            low_b = min(range(NUM_BANKS), key=filtered_voltages.__getitem__) + 1 # Bank number with lowest voltage
+            max_v = filtered_voltages[high_b - 1] # Highest voltage
+            min_v = filtered_voltages[low_b - 1] # Lowest voltage
             current_time = time.time()
             any_low_temp = any(t is not None and t < 10 for t in calibrated_temps)
+            # Hysteresis: once the banks settle below the threshold, go back to the normal threshold.
+            if max_v - min_v <= settings['VoltageDifferenceToBalance']:
+                balance_hysteresis_active = False
+            balance_threshold = settings['VoltageDifferenceToBalance'] + (settings['BalanceHysteresis'] if balance_hysteresis_active else 0.0)
             # Condition.
-            if balancing_active or (not alert_needed and (any_low_temp or max_v - min_v > settings['VoltageDifferenceToBalance']) and min_v > 0 and current_time - last_balance_time > settings['BalanceRestPeriodSeconds']):
+            if balancing_active or (not alert_needed and (any_low_temp or max_v - min_v > balance_threshold) and min_v > 0 and current_time - last_balance_time > settings['BalanceRestPeriodSeconds']):
                 is_heating = any_low_temp
-                balance_battery_voltages(stdscr, high_b, low_b, settings, temps_alerts, is_heating=is_heating) # Transfer charge
+                balance_battery_voltages(stdscr, high_b, low_b, settings, temps_alerts, is_heating=is_heating, voltages=battery_voltages) # Transfer charge
                 balancing_active = False
+                tui_snapshot = None # Balancing drew its own progress screen—redraw the dashboard.
+                balance_hysteresis_active = True
         # Update web data (locked).
         with data_lock:
             web_data['voltages'] = battery_voltages
@@ -3222,20 +3551,39 @@ def main(stdscr):
             web_data['balancing'] = balancing_active
             web_data['last_update'] = time.time()
             web_data['system_status'] = 'Alert' if alert_needed else 'Running'
-        # Draw TUI.
-        draw_tui(
-            stdscr, battery_voltages, calibrated_temps, raw_temps,
-            startup_offsets or [0]*total_channels, bank_stats,
-            startup_median, all_alerts, settings, startup_set, is_startup=(run_count == 0)
-        )
+        # Draw TUI, but only if something it shows has changed (values at display precision, alerts, events).
+        snapshot = (tuple(f"{v:.2f}" for v in battery_voltages),
+                    tuple(None if t is None else round(t, 1) for t in calibrated_temps),
+                    tuple(all_alerts), len(event_log), event_log[-1] if event_log else None, startup_median, run_count == 0)
+        if snapshot != tui_snapshot:
+            draw_tui(
+                stdscr, battery_voltages, calibrated_temps, raw_temps,
+                startup_offsets or [0]*total_channels, bank_stats,
+                startup_median, all_alerts, settings, startup_set, is_startup=(run_count == 0)
+            )
+            tui_snapshot = snapshot
+        else:
+            logging.debug("Readings unchanged; TUI not redrawn.")
         # Update alive.
         alive_timestamp = time.time() # Update aliveness for watchdog thread
         run_count += 1
         # Cleanup.
         gc.collect()
         logging.info("Poll cycle complete.")
-        # Sleep.
-        time.sleep(settings['poll_interval'])
+        # Sleep until the deadline, waking early for key presses ('q' quits).
+        while True:
+            remaining = next_poll - time.monotonic()
+            if remaining <= 0:
+                break
+            select.select([sys.stdin], [], [], remaining)
+            key = stdscr.getch()
+            if key in (ord('q'), ord('Q')):
+                signal_handler(signal.SIGINT, None)
+            elif key == curses.KEY_RESIZE:
+                tui_snapshot = None # New size—redraw next cycle.
+        # Cycle overran the interval—restart the schedule instead of running back-to-back catch-up cycles.
+        if next_poll < time.monotonic():
+            next_poll = time.monotonic()
       
 if __name__ == '__main__':
     # Arg parser.
@@ -3256,11 +3604,15 @@ if __name__ == '__main__':
             print(f"Configuration validation failed: {e}")
             sys.exit(1)
     else:
-        # Setup logging.
+        # Setup logging: rotating file (5 MB x 3) so the log can't fill the SD card, behind a buffer that
+        # writes in batches of 100 records and at once on warnings/errors, instead of one disk write per line.
+        file_handler = logging.handlers.RotatingFileHandler(
+            os.path.join(data_dir, 'battery_monitor.log'), maxBytes=5 * 1024 * 1024, backupCount=3
+        )
+        file_handler.setFormatter(logging.Formatter('%(asctime)s - %(message)s'))
         logging.basicConfig(
-            filename=os.path.join(data_dir, 'battery_monitor.log'),
             level=logging.INFO,
-            format='%(asctime)s - %(message)s'
+            handlers=[logging.handlers.MemoryHandler(100, flushLevel=logging.WARNING, target=file_handler)]
         )
         # Read config.
         config_parser.read(os.path.join(data_dir, 'battery_monitor.ini'))
@@ -18,6 +18,14 @@ sudo apt-get install -y python3-pip python3-smbus i2c-tools
 echo "Enabling I2C interface..."
 sudo raspi-config nonint do_i2c 0
 
+# Run the I2C bus at 400 kHz fast mode (default is 100 kHz); the ADC and multiplexer both support it
+echo "Setting I2C bus speed to 400 kHz..."
+BOOT_CONFIG=/boot/firmware/config.txt
+[ -f "$BOOT_CONFIG" ] || BOOT_CONFIG=/boot/config.txt
+if ! grep -q "^dtparam=i2c_arm_baudrate=" "$BOOT_CONFIG"; then
+    echo "dtparam=i2c_arm_baudrate=400000" | sudo tee -a "$BOOT_CONFIG" > /dev/null
+fi
+
 # Install Python dependencies
 echo "Installing Python dependencies..."
 pip3 install -r requirements.txt